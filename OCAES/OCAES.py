@@ -1,8 +1,249 @@
+import time
+from types import SimpleNamespace
+import numpy as np
 import pandas as pd
 from pyomo.environ import *
+from pyomo.common.gc_manager import PauseGC
 import matplotlib.pyplot as plt
 import seaborn as sns
 from OCAES import OCAES_rules as rules
+from OCAES.OCAES_sparse import ocaes_lp
+from OCAES.OCAES_greedy import greedy_dispatch
+from OCAES.OCAES_precheck import dispatch_precheck, precheck_objectives, InfeasibleDispatchError
+from OCAES.OCAES_template import get_template, get_template_solver
+from OCAES.OCAES_cache import cache_key, load_structure, save_structure
+from OCAES.OCAES_aggregation import representative_days, reduce_series, day_weights
+from OCAES.OCAES_rolling import rolling_lp
+
+# capacities that are optimized (variables) instead of fixed (parameters), by objective
+capacity_vars = {'CD_FIX_DISP': ['X_wind', 'X_well', 'X_cmp', 'X_exp', 'X_storage'],
+                 'CD_FIX_DISP_STOR': ['X_wind'],
+                 'CD_FIX_WIND_STOR': ['X_dispatch']}
+
+# objectives with the power delivered to the grid held constant
+constant_dispatch = ['CD_FIX_DISP', 'CD_FIX_WIND_STOR', 'CD_FIX_DISP_STOR', 'CD_FIX_DISP_WIND_STOR']
+
+# objective rule, objective variable and sense, by objective
+objectives = {'COVE': (rules.objective_COVE, 'yearly_electricity_value', maximize),
+              'REVENUE': (rules.objective_revenue, 'yearly_electricity_revenue', maximize),
+              'REVENUE_ARBITRAGE': (rules.objective_revenue, 'yearly_electricity_revenue', maximize),
+              'PROFIT': (rules.objective_PROFIT, 'yearly_profit', maximize),
+              'CD_FIX_DISP': (rules.objective_COST, 'yearly_costs', minimize),
+              'CD_FIX_WIND_STOR': (rules.objective_COVE, 'yearly_electricity_value', maximize),
+              'CD_FIX_DISP_STOR': (rules.objective_COST, 'yearly_costs', minimize),
+              'CD_FIX_DISP_WIND_STOR': (rules.objective_COST, 'yearly_costs', minimize)}
+
+
+# inputs that resolve() can change by updating mutable parameters
+mutable_inputs = ['X_wind', 'X_well', 'X_cmp', 'X_exp', 'X_dispatch',
+                  'pwr2energy', 'eta_storage', 'min_storage_fr',
+                  'C_wind', 'C_well', 'C_cmp', 'C_exp',
+                  'V_wind', 'V_cmp', 'V_exp',
+                  'F_wind', 'F_well', 'F_cmp', 'F_exp',
+                  'interest', 'inflation',
+                  'L_wind', 'L_well', 'L_cmp', 'L_exp',
+                  'CC_value', 'CC_wind', 'CC_exp']
+
+# variables defined by an equality (declared as expressions in the compact model) and the rule of their defining
+# expression, in the order they depend on each other (yearly_capacity_credit_simple for constant dispatch)
+defined_variables = {'P_wind': rules.P_wind_expr,
+                     'electricity_revenue': rules.electricity_revenue_expr,
+                     'avoided_emissions': rules.avoided_emissions_expr,
+                     'yearly_electricity': rules.yearly_electricity_expr,
+                     'yearly_electricity_generated': rules.yearly_electricity_generated_expr,
+                     'yearly_electricity_purchased': rules.yearly_electricity_purchased_expr,
+                     'yearly_curtailment': rules.yearly_curtailment_expr,
+                     'yearly_exp_usage': rules.yearly_exp_usage_expr,
+                     'yearly_cmp_usage': rules.yearly_cmp_usage_expr,
+                     'yearly_electricity_revenue': rules.yearly_electricity_revenue_expr,
+                     'yearly_capacity_credit': rules.yearly_capacity_credit_expr,
+                     'yearly_total_revenue': rules.yearly_total_revenue_expr,
+                     'yearly_costs': rules.yearly_costs_expr,
+                     'yearly_profit': rules.yearly_profit_expr,
+                     'yearly_electricity_value': rules.yearly_electricity_value_expr}
+
+# internal units of the model (inputs['scaling']), GW, GWh, M$ and kton in place of MW, MWh, $ and ton, which brings
+# the coefficients (e.g. capital costs of millions of $/MW) closer to one, internal value = value * factor
+# by name of parameter, variable or expression, other names (fractions, efficiencies, hours, years) are not scaled
+scaling_factors = {}
+for name in ['X_wind', 'X_well', 'X_cmp', 'X_exp', 'X_storage', 'X_dispatch', 'X_credit', 'P_cmp_max', 'P_exp_max',
+             'P_wind', 'P_cmp', 'P_exp', 'P_curtail', 'P_grid_sell', 'P_grid_buy']:
+    scaling_factors[name] = 1e-3  # power, MW to GW
+for name in ['E_well', 'E_well_init', 'yearly_electricity', 'yearly_electricity_generated',
+             'yearly_electricity_purchased', 'yearly_curtailment', 'yearly_exp_usage', 'yearly_cmp_usage',
+             'yearly_electricity_value']:
+    scaling_factors[name] = 1e-3  # energy, MWh to GWh
+for name in ['electricity_revenue', 'yearly_electricity_revenue', 'yearly_capacity_credit', 'yearly_total_revenue',
+             'yearly_costs', 'yearly_profit']:
+    scaling_factors[name] = 1e-6  # money, $ to M$
+for name in ['price_grid', 'price_grid_average', 'C_wind', 'C_well', 'C_cmp', 'C_exp', 'V_wind', 'V_cmp', 'V_exp',
+             'F_wind', 'F_well', 'F_cmp', 'F_exp', 'CC_value']:
+    scaling_factors[name] = 1e-3  # money per power or energy, e.g. $/MW to M$/GW
+for name in ['avoided_emissions', 'avoided_emissions_min']:
+    scaling_factors[name] = 1e-3  # emissions, ton to kton (emissions_grid, ton/MWh = kton/GWh, is unchanged)
+
+# solvers in order of preference, HiGHS (in-process, installed with highspy) unless a commercial solver is found
+solvers = ['gurobi', 'cplex', 'appsi_highs', 'glpk', 'cbc']
+
+# solvers in order of preference for the LP file path (inputs['solver_io'] file), HiGHS only if none is installed
+file_solvers = ['gurobi', 'cplex', 'glpk', 'cbc', 'appsi_highs']
+
+# persistent (in-memory) counterparts of the solvers, these only send changed coefficients when solving again
+persistent_solvers = {'gurobi': 'appsi_gurobi', 'cplex': 'appsi_cplex', 'cbc': 'appsi_cbc'}
+
+# termination conditions without a solution to load (see solve_instance)
+no_solution = [TerminationCondition.infeasible, TerminationCondition.unbounded,
+               TerminationCondition.infeasibleOrUnbounded, TerminationCondition.error]
+
+# solver availability by name, probed once per process (see solver_available)
+available_solvers = {}
+
+# native solver options by profile and solver (scipy is the sparse backend), see inputs['solver_profile']
+# sweep - one thread and dual simplex, for many cases solved in parallel
+# single - all cores and barrier, for one large case
+# barrier - all cores and barrier without crossover, for long horizons, the interior solution is used as is and its
+# quality reported by the duality gap (see duality_gap), scipy's linprog always runs crossover, HiGHS reports it as
+# unknown, it is accepted as optimal if feasible within barrier_gap (see accept_interior_solution)
+solver_profiles = {'default': {},
+                   'sweep': {'gurobi': {'Threads': 1, 'Method': 1},
+                             'cplex': {'threads': 1, 'lpmethod': 2},
+                             'highs': {'threads': 1, 'solver': 'simplex', 'simplex_strategy': 1},
+                             'glpk': {'dual': ''},
+                             'scipy': {'method': 'highs-ds'}},
+                   'single': {'gurobi': {'Threads': 0, 'Method': 2},
+                              'cplex': {'threads': 0, 'lpmethod': 4},
+                              'highs': {'threads': 0, 'solver': 'ipm'},
+                              'glpk': {'interior': ''},
+                              'scipy': {'method': 'highs-ipm'}},
+                   'barrier': {'gurobi': {'Threads': 0, 'Method': 2, 'Crossover': 0},
+                               'cplex': {'threads': 0, 'lpmethod': 4, 'solutiontype': 2},
+                               'highs': {'threads': 0, 'solver': 'ipm', 'run_crossover': 'off'},
+                               'glpk': {'interior': ''},
+                               'scipy': {'method': 'highs-ipm'}}}
+
+# largest duality gap of an interior solution (barrier profile) accepted as optimal
+barrier_gap = 1e-6
+
+# loose optimality and feasibility tolerances by solver (scipy is the sparse backend), for screening many cases
+# (inputs['screening']), objective values to about 0.01%, the solver defaults are used otherwise (glpk has no
+# tolerance options on its command line)
+screening_tolerances = {'gurobi': {'FeasibilityTol': 1e-4, 'OptimalityTol': 1e-4, 'BarConvTol': 1e-4},
+                        'cplex': {'simplex_tolerances_feasibility': 1e-4, 'simplex_tolerances_optimality': 1e-4,
+                                  'barrier_convergetol': 1e-4},
+                        'cbc': {'primalTolerance': 1e-4, 'dualTolerance': 1e-4},
+                        'highs': {'primal_feasibility_tolerance': 1e-4, 'dual_feasibility_tolerance': 1e-4,
+                                  'ipm_optimality_tolerance': 1e-4},
+                        'scipy': {'primal_feasibility_tolerance': 1e-4, 'dual_feasibility_tolerance': 1e-4,
+                                  'ipm_optimality_tolerance': 1e-4}}
+
+
+def compatible_objectives(objective):
+    # objectives that share the model structure (variables and constraints) of objective
+    def structure(name):
+        return capacity_vars.get(name, []), name == 'REVENUE_ARBITRAGE', name in constant_dispatch
+
+    return [name for name in objectives if structure(name) == structure(objective)]
+
+
+def solver_available(name):
+    # probing can start a subprocess or check a license, so it is done once per process
+    if name not in available_solvers:
+        available_solvers[name] = SolverFactory(name).available(exception_flag=False)
+    return available_solvers[name]
+
+
+def get_solver(names=solvers):
+    # first available solver of names (see solvers and file_solvers)
+    for name in names:
+        if solver_available(name):
+            return SolverFactory(name)
+    raise RuntimeError('could not find a suitable solver, install HiGHS with: pip install highspy')
+
+
+def is_persistent(opt):
+    return hasattr(opt, 'is_persistent') and opt.is_persistent()
+
+
+def solver_name(opt):
+    # name of the solver behind the interface, e.g. gurobi for gurobi, gurobi_direct and appsi_gurobi
+    if hasattr(opt, 'name'):
+        return opt.name.split('_')[0]
+    for cls in type(opt).__mro__:  # appsi interfaces are defined in a module named after the solver
+        if cls.__module__.startswith('pyomo.contrib.appsi.solvers.'):
+            return cls.__module__.split('.')[-1]
+    return None
+
+
+def set_profile(opt, profile, screening=False):
+    # pass the native options of the solver profile (see solver_profiles) to opt, and the loose tolerances if screening
+    opt.options.update(solver_profiles[profile].get(solver_name(opt), {}))
+    if screening:
+        opt.options.update(screening_tolerances.get(solver_name(opt), {}))
+    return opt
+
+
+def get_persistent_solver(opt):
+    # persistent counterpart of solver opt (the same engine) if available, otherwise opt through its LP file
+    name = persistent_solvers.get(solver_name(opt))
+    if name is not None and solver_available(name):
+        return SolverFactory(name)
+    print("Solver interface            : " + str(solver_name(opt)) + " through LP files, no in-memory interface")
+    return opt
+
+
+def highs_info(opt):
+    # solution info of the last solve of in-process HiGHS, read through a private attribute of the appsi wrapper,
+    # None for other solvers or if the wrapper no longer exposes it
+    model = getattr(opt, '_solver_model', None)
+    if solver_name(opt) != 'highs' or not hasattr(model, 'getInfo'):
+        return None
+    return model.getInfo()
+
+
+def duality_gap(opt):
+    # relative gap between the primal and dual objective of the last solve, as reported by in-process HiGHS,
+    # nan for other solvers (barrier solvers stop at their own convergence tolerance, e.g. BarConvTol for gurobi)
+    info = highs_info(opt)
+    return getattr(info, 'primal_dual_objective_error', np.nan)
+
+
+def iteration_count(opt):
+    # simplex, barrier and crossover iterations of the last solve, as reported by in-process HiGHS, nan for other
+    # solvers, a warm started solve (e.g. resolve() with a persistent solver) takes far fewer than a cold one
+    info = highs_info(opt)
+    return sum(getattr(info, name, np.nan) for name in ['simplex_iteration_count', 'ipm_iteration_count',
+                                                         'crossover_iteration_count'])
+
+
+def accept_interior_solution(results, opt):
+    # in-process HiGHS reports an interior solution without crossover as unknown even when it is primal feasible and
+    # optimal to within its duality gap, such a solution with a gap of at most barrier_gap is reported as optimal
+    info = highs_info(opt)
+    if results.solver.termination_condition == TerminationCondition.unknown and \
+            getattr(info, 'primal_solution_status', None) == 2 and duality_gap(opt) <= barrier_gap:  # 2 is feasible
+        results.solver.termination_condition = TerminationCondition.optimal
+        results.solver.status = SolverStatus.ok
+    return results
+
+
+def objective_component(rule, sense, barrier=False):
+    # objective of rule, barrier=True always minimizes (maximize objectives are negated), HiGHS reports the duals of an
+    # interior solution (no crossover) of a maximization with the wrong sign, which spoils the duality gap
+    if barrier and sense == maximize:
+        return Objective(sense=minimize, rule=lambda model: -rule(model))
+    return Objective(sense=sense, rule=rule)
+
+
+def from_array(values):
+    # initialize a pyomo component indexed by model.t (1 to T-1) from a numpy array
+    return lambda model, t: values[t - 1]
+
+
+def clip_to_bounds(component, values):
+    # values of an indexed variable (one per index, in order) within its bounds, which are the same at every time step
+    # (see the _bounds rules), read from its first variable
+    var = next(iter(component.values()))
+    return np.clip(values, -np.inf if var.lb is None else var.lb, np.inf if var.ub is None else var.ub)
 
 
 class ocaes:
@@ -29,6 +270,47 @@ class ocaes:
         # CD_FIX_DISP_STOR - dispatch and storage fixed, wind is optimzied (variable)
         # CD_FIX_WIND_STOR - wind and stoarge are fixed, dispatch is optimized (variable)
 
+        inputs['backend'] = 'pyomo'  # model backend
+        # options are pyomo (rule based pyomo model) or sparse (scipy.sparse matrices solved by scipy's HiGHS)
+        inputs['model_type'] = 'abstract'  # pyomo model type
+        # options are abstract (AbstractModel + create_instance) or concrete (ConcreteModel, components built once)
+        inputs['compact'] = False  # pyomo model formulation
+        # True substitutes the variables defined by an equality (P_wind, electricity_revenue, avoided_emissions and
+        # the yearly totals) as expressions, False declares them as variables with a defining constraint
+        inputs['solver_io'] = 'memory'  # how the model is passed to the solver
+        # options are memory (in-memory interface of the solver if available, otherwise its LP file)
+        # or file (LP file written for a solver subprocess, glpk or cbc before HiGHS, which always runs in-process)
+        # or template (MPS file of the sparse model for glpk or cbc, written once per time series and objective and
+        # then patched in place, see OCAES_template, the sparse model is solved in memory if neither is installed)
+        inputs['model_cache'] = None  # directory of the compiled model cache (see OCAES_cache), or None
+        # the sparse model (backend sparse or solver_io template) reads the structure of its matrix from the cache,
+        # shared by parallel processes and later runs, and only computes the values of the case
+        inputs['representative_days'] = None  # number of representative days, or None to solve every time step
+        # days are clustered on price, wind and emissions (see OCAES_aggregation), the sparse model is solved for the
+        # representative days with the storage level linked from day to day, see validate_aggregation for its error
+        # (2019 data, COVE with 168 h storage: revenue 3.5% low with 12 days, 1.6% low with 48 days), capacities
+        # optimized on representative days are biased (CD_FIX_DISP with 24 days: X_wind and X_well off by 10-18%),
+        # use them to screen cases with fixed capacities rather than to size the plant
+        inputs['rolling_horizon'] = None  # committed window and lookahead [hr], e.g. (336.0, 48.0) for two weeks with
+        # a two day lookahead, or None to solve the whole time series at once, for multi-year time series the sparse
+        # model is solved one window at a time (see OCAES_rolling), capacities have to be fixed
+        inputs['initial_storage_fr'] = 0.5  # initial storage level of a rolling_horizon, fraction of max [-], the
+        # last window returns to it (the full model optimizes it)
+        inputs['solver_profile'] = 'default'  # solver threads and algorithm, see solver_profiles
+        # options are default (solver defaults), sweep (1 thread, dual simplex), single (all cores, barrier)
+        # or barrier (all cores, barrier without crossover)
+        inputs['screening'] = False  # True solves with loose tolerances (see screening_tolerances), to rank many
+        # cases quickly, cases that matter are then solved again at full precision (False, solver defaults)
+        inputs['scaling'] = False  # True solves in internal units (GW, GWh, M$, kton, see scaling_factors) for
+        # solvers without scaling of their own (HiGHS, gurobi and cplex scale internally), results are always reported
+        # in MW, MWh, $ and ton
+        inputs['initial_point'] = 'zero'  # starting values of the variables
+        # options are zero or greedy (greedy storage dispatch, see OCAES_greedy), greedy halves the simplex iterations
+        # of in-process HiGHS but not its solver time on a year of hourly data, it pays off on shorter time series
+        inputs['precheck'] = False  # True checks constant dispatch with fixed storage for infeasibility before the
+        # model is built (see OCAES_precheck), infeasible cases raise InfeasibleDispatchError instead of being solved,
+        # e.g. for sweeps that skip them, False solves every case and reports infeasible ones by their termination
+
         # Power capacity [MW]
         inputs['X_wind'] = 500.0  # wind farm
         inputs['X_well'] = 500.0  # well
@@ -115,23 +397,18 @@ class ocaes:
 
         return inputs
 
-    def __init__(self, data, inputs=get_default_inputs()):
+    def __init__(self, data, inputs=get_default_inputs(), solver=None):
         # store data and inputs
+        # solver (name or pyomo solver) is used as given, without probing for available solvers
         self.data = data
         self.inputs = inputs
+        self.solver = solver
         self.results = []
 
         # ================================
         # check for proper inputs
         # ================================
-        if inputs['L_wind'] < 1.0:
-            inputs['L_wind'] = 1.0
-        if inputs['L_well'] < 1.0:
-            inputs['L_well'] = 1.0
-        if inputs['L_cmp'] < 1.0:
-            inputs['L_cmp'] = 1.0
-        if inputs['L_exp'] < 1.0:
-            inputs['L_exp'] = 1.0
+        self.check_inputs()
 
         # ================================
         # Calculate wind power generated (fraction of rated)
@@ -149,22 +426,608 @@ class ocaes:
         data.loc[:, 'R'] = data.price_dollarsPerMWh / data.price_dollarsPerMWh.mean()  # normalized price
 
         # ================================
-        # Process data
-        # Move time series data to dictionaries to be compatible with pyomo indexed format
+        # Calculate model parameters
+        # ================================
+        self.params = self.get_parameters()
+        self.model = None
+        self.instance = None
+
+        # representative days and the day sequence, if the time series is aggregated
+        self.aggregation = self.aggregate_days()
+
+        # ================================
+        # Check constant dispatch for infeasibility, before the model is built
+        # ================================
+        self.precheck = self.check_dispatch()
+
         # ================================
-        T = len(data) + 1  # number of time steps
-        P_wind_dict = {i: data.P_wind_fr[i - 1] for i in range(1, T)}  # wind power (fraction of capacity)
-        price_dict = {i: data.price_dollarsPerMWh[i - 1] for i in range(1, T)}  # electricity price in $/MWh
-        emissions_dict = {i: data.emissions_tonCO2PerMWh[i - 1] for i in range(1, T)}  # emissions [ton/MWh]
+        # Create and solve model
+        # ================================
+        self.basis_kept = False  # True if the last solve started from the basis of the one before (see solve)
+        self.solved = (None, None)  # solver and instance of the last pyomo solve
+        self.loaded = False  # True if the solution of the last pyomo solve was loaded (see solve_instance)
+        if inputs['backend'] == 'sparse' or inputs['solver_io'] == 'template' or self.aggregation is not None or \
+                inputs['rolling_horizon'] is not None:
+            self.lp = self.create_sparse_model()
+            start = time.time()
+            results = self.solve_lp()
+        else:
+            model, instance = self.create_instance()
+
+            # set solver
+            if solver is None:
+                opt = get_solver(file_solvers if inputs['solver_io'] == 'file' else solvers)
+            elif isinstance(solver, str):
+                opt = SolverFactory(solver)
+            else:
+                opt = solver
+
+            # in-memory interface of the same solver if available, this skips the LP and solution file round trip
+            if solver is None and inputs['solver_io'] == 'memory' and not is_persistent(opt):
+                opt = get_persistent_solver(opt)
+            set_profile(opt, inputs['solver_profile'], inputs['screening'])
+
+            # Store model, instance and solver
+            self.model = model
+            self.instance = instance
+            self.opt = opt
+
+            # solve, from the initial point if it is feasible and the solver can use it
+            start = time.time()
+            if self.warm_start and opt.warm_start_capable():
+                results = self.solve_instance(warmstart=True)
+            else:
+                results = self.solve_instance()
+
+        self.solver_time = time.time() - start  # time to solve [s], including the solver interface
+        self.duality_gap = self.lp.duality_gap() if self.instance is None else duality_gap(self.opt)
+        self.iterations = self.lp.solution.nit if self.instance is None else iteration_count(self.opt)
+        # coefficient ranges (see get_coefficient_ranges) build the sparse model twice more, only when scaling or debug
+        self.coefficient_ranges = self.get_coefficient_ranges() if inputs['scaling'] or inputs['debug'] else None
+
+        print("Solver status               : " + str(results.solver.status))
+        print("Solver termination condition: " + str(results.solver.termination_condition))
+        print("Solver time [s]             : " + str(round(self.solver_time, 3)))
+        print("Solver iterations           : " + str(self.iterations))
+        print("Duality gap [-]             : " + str(self.duality_gap))
+        if self.coefficient_ranges is not None:
+            for name, ranges in self.coefficient_ranges.iterrows():
+                label = (name.capitalize() + " range [before, after]").ljust(28)
+                print(label + ": [%.1e, %.1e], [%.1e, %.1e]" % tuple(ranges))
+
+        # Store results
+        self.results = results
+
+    def create_instance(self):
+        # build the pyomo model, returns the model and its instance
+        with PauseGC():  # pause garbage collection while building, as create_instance does
+            model = self.create_model()
+
+        if self.inputs['model_type'] == 'concrete':
+            instance = model  # components were constructed when declared
+        elif self.inputs['debug']:
+            instance = model.create_instance(report_timing=True)
+            instance.preprocess()
+        else:
+            instance = model.create_instance(report_timing=False)
+            instance.preprocess()
+        self.warm_start = False  # start the first solve from the variable values (see set_initial_point)
+        if self.inputs['initial_point'] == 'greedy':
+            self.warm_start = self.set_initial_point(instance)
+        return model, instance
+
+    def set_initial_point(self, instance):
+        # start the variables from the greedy storage dispatch (see greedy_dispatch) in place of all zeros, the
+        # variables defined by an equality follow from their defining expression
+        # returns True if the starting point is feasible, an infeasible start (constant dispatch not met) slows the
+        # solvers down and is not passed as a warm start
+        objective = self.inputs['objective']
+        p, series = self.internal_units(self.params), self.internal_units(self.get_series())
+        start = greedy_dispatch(p, series, arbitrage=objective == 'REVENUE_ARBITRAGE',
+                                dispatch_const=objective in constant_dispatch, storage=self.has_storage())
+        # the defined variables indexed by time (P_wind, from the greedy dispatch, and electricity_revenue) follow from
+        # the arrays, evaluating their rules one time step at a time would take longer than the start saves
+        start['electricity_revenue'] = (start['P_grid_sell'] - start['P_grid_buy']) * p['delta_t'] * \
+            series['price_grid']
+        for name, values in start.items():
+            component = instance.component(name)
+            if isinstance(component, Var) and component.is_indexed():  # within bounds, no need to validate each
+                start[name] = clip_to_bounds(component, values)
+                component.set_values(dict(zip(instance.t, start[name])), skip_validation=True)
+            elif isinstance(component, Var):
+                component.set_value(values)
+        # the single value ones follow from their rules, evaluated on the single values of the instance and the time
+        # sums (total_<variable>[_<weight>]) of the arrays, in place of the pyomo sums over every time step
+        single = SimpleNamespace(**{component.local_name: value(component, exception=False) for component in
+                                    instance.component_objects((Param, Var)) if not component.is_indexed()})
+        for name in ['P_wind', 'P_cmp', 'P_exp', 'P_curtail', 'P_grid_sell', 'P_grid_buy']:
+            setattr(single, 'total_' + name, start[name].sum())
+        for name in ['P_grid_sell', 'P_grid_buy']:
+            for weight in ['price_grid', 'emissions_grid']:
+                setattr(single, 'total_' + name + '_' + weight, np.dot(start[name], series[weight]))
+        for name, rule in defined_variables.items():
+            if name in start:  # indexed by time, set above
+                continue
+            if name == 'yearly_capacity_credit' and objective in constant_dispatch:
+                rule = rules.yearly_capacity_credit_simple_expr
+            setattr(single, name, value(rule(single)))
+            component = instance.component(name)
+            if isinstance(component, Var):
+                component.set_value(getattr(single, name))
+        if objective in constant_dispatch:
+            return bool(np.all(start['P_grid_sell'] >= p['X_dispatch'] - 1e-9))
+        return True
+
+    def has_storage(self):
+        # False if the storage capacities are fixed at zero (e.g. wind_only), the storage block is then left out of
+        # the model and its power and energy are reported as zero
+        objective = self.inputs['objective']
+        if any(name in capacity_vars.get(objective, []) for name in ['X_well', 'X_cmp', 'X_exp']):
+            return True
+        return any(self.params[name] > 0.0 for name in ['X_well', 'X_cmp', 'X_exp'])
+
+    def check_inputs(self):
+        inputs = self.inputs
+        if inputs['L_wind'] < 1.0:
+            inputs['L_wind'] = 1.0
+        if inputs['L_well'] < 1.0:
+            inputs['L_well'] = 1.0
+        if inputs['L_cmp'] < 1.0:
+            inputs['L_cmp'] = 1.0
+        if inputs['L_exp'] < 1.0:
+            inputs['L_exp'] = 1.0
 
         # Constraints do not work if the RTE<=0
         if inputs['eta_storage'] <= 0.0:
             inputs['eta_storage'] = 0.01  # Replace with a very low efficiency
 
+    def check_dispatch(self):
+        # feasibility precheck (see dispatch_precheck) of the objectives in precheck_objectives, returns the status
+        # (infeasible, borderline or passed) and the check with the least slack, None if not checked
+        # raises InfeasibleDispatchError if infeasible, borderline and passed cases are left to the solver
+        objective = self.inputs['objective']
+        if not self.inputs['precheck'] or objective not in precheck_objectives:
+            return None
+        status, check = dispatch_precheck(self.params, self.get_series(),
+                                          wind_fixed='X_wind' not in capacity_vars.get(objective, []),
+                                          storage=self.has_storage())
+        if status == 'infeasible':
+            raise InfeasibleDispatchError('X_dispatch of ' + str(self.params['X_dispatch']) + ' MW is infeasible for '
+                                          + objective + ', fails check: ' + check)
+        return status, check
+
+    def resolve(self, **updates):
+        # change inputs that only set parameter values (see mutable_inputs) and solve again without rebuilding,
+        # e.g. model.resolve(X_well=100.0, X_cmp=100.0, X_exp=100.0)
+        for name in updates:
+            if name not in mutable_inputs:
+                raise ValueError('resolve() can not change ' + name + ', create a new ocaes model instead')
+            if name in capacity_vars.get(self.inputs['objective'], []):
+                raise ValueError(name + ' is optimized for objective ' + self.inputs['objective'])
+        for name, value in updates.items():
+            self.inputs[name] = value
+        self.check_inputs()
+        storage = self.has_storage()  # with the previous parameters
+        params, self.params = self.params, self.get_parameters()  # params keeps the previous values
+
+        if self.instance is not None and storage != self.has_storage():
+            # storage capacity changed from or to zero, the storage block is added or removed
+            self.model, self.instance = self.create_instance()
+        elif self.instance is not None:
+            # only the changed parameter values are sent to the instance
+            for name, value in self.params.items():
+                if value == params[name]:
+                    continue
+                component = getattr(self.instance, name, None)
+                if component is not None:
+                    component.set_value(value * self.unit(name))
+
+        self.precheck = self.check_dispatch()
+        return self.solve()
+
+    def solve_prices(self, prices):
+        # solve the built model for each row of prices [$/MWh], a 2-D array (number of price vectors x time steps),
+        # only the price parameters change between solves (persistent solvers warm start from the previous solution)
+        # returns one row of single value results (see get_full_results) per price vector,
+        # the model is left solved for the last price vector
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        if prices.shape[1] != len(self.data):
+            raise ValueError('each price vector needs one price per time step (' + str(len(self.data)) + ')')
+
+        self.data = self.data.copy()  # keep the caller's data unchanged
+        rows = []
+        for price in prices:
+            self.data.loc[:, 'price_dollarsPerMWh'] = price
+            self.data.loc[:, 'R'] = price / price.mean()  # normalized price
+            self.params['price_grid_average'] = price.mean()
+            if self.instance is not None:
+                self.instance.price_grid.store_values(dict(zip(self.instance.t, price * self.unit('price_grid'))))
+                self.instance.price_grid_average.set_value(price.mean() * self.unit('price_grid_average'))
+            self.solve()
+            df, s = self.get_full_results()
+            rows.append(s)
+        return pd.DataFrame(rows).reset_index(drop=True)
+
+    def pareto_frontier(self, n_points=20):
+        # revenue vs. avoided emissions trade-off by the epsilon-constraint method: the yearly electricity revenue is
+        # maximized while a lower bound on the avoided emissions is tightened step by step, from the avoided emissions
+        # at maximum revenue up to the maximum avoided emissions
+        # the built model is reused and only the bound changes between solves (persistent solvers warm start from the
+        # previous basis), returns one row of single value results (see get_full_results) per point,
+        # the model is left solved with its own objective
+        instance = self.instance
+        if self.inputs['rolling_horizon'] is not None:
+            raise ValueError('pareto_frontier bounds the avoided emissions of the whole time series, it can not be '
+                             'solved as a rolling_horizon')
+        if instance is not None and instance.component('cnst_avoided_emissions_min') is None:
+            instance.avoided_emissions_min = Param(initialize=0.0, mutable=True)  # epsilon [ton, internal units]
+            instance.cnst_avoided_emissions_min = Constraint(rule=rules.avoided_emissions_min)
+            barrier = self.inputs['solver_profile'] == 'barrier'
+            instance.objective_pareto_revenue = objective_component(rules.objective_revenue, maximize, barrier)
+            instance.objective_pareto_emissions = objective_component(rules.objective_avoided_emissions, maximize,
+                                                                      barrier)
+
+        def solve_point(objective_var, bound=None):
+            # maximize objective_var, with the avoided emissions bound if given
+            if instance is None:  # sparse backend
+                self.lp = self.create_sparse_model(objective_var, maximize, bound)
+                self.results = self.solve_lp()
+                return self.lp.value('avoided_emissions')
+
+            for name in compatible_objectives(self.inputs['objective']):
+                instance.component('objective_' + name).deactivate()
+            if objective_var == 'avoided_emissions':
+                instance.objective_pareto_emissions.activate()
+                instance.objective_pareto_revenue.deactivate()
+            else:
+                instance.objective_pareto_revenue.activate()
+                instance.objective_pareto_emissions.deactivate()
+            if bound is None:
+                instance.cnst_avoided_emissions_min.deactivate()
+            else:
+                instance.avoided_emissions_min.set_value(bound)
+                instance.cnst_avoided_emissions_min.activate()
+            self.solve()
+            return value(instance.avoided_emissions)
+
+        # end points of the frontier
+        emissions_max = solve_point('avoided_emissions')
+        emissions_max -= 1e-6 * abs(emissions_max)  # keep the last bound feasible within solver tolerances
+        emissions_min = solve_point('yearly_electricity_revenue')
+
+        rows = []
+        for bound in np.linspace(emissions_min, max(emissions_min, emissions_max), n_points):
+            solve_point('yearly_electricity_revenue', bound)
+            df, s = self.get_full_results()
+            s['avoided_emissions_min'] = bound / self.unit('avoided_emissions_min')
+            rows.append(s)
+
+        # restore the model objective
+        if instance is None:
+            self.lp = self.create_sparse_model()
+            self.results = self.solve_lp()
+        else:
+            instance.cnst_avoided_emissions_min.deactivate()
+            instance.objective_pareto_revenue.deactivate()
+            instance.objective_pareto_emissions.deactivate()
+            instance.component('objective_' + self.inputs['objective']).activate()
+            self.solve()
+
+        return pd.DataFrame(rows).reset_index(drop=True)
+
+    def solve(self, objective=None):
+        # solve the built model again, e.g. after parameter values were changed
+        # objective switches to another objective that shares the model structure (see compatible_objectives)
+        if objective is not None and objective != self.inputs['objective']:
+            if objective not in compatible_objectives(self.inputs['objective']):
+                raise ValueError('objective ' + objective + ' does not share the model structure of ' +
+                                 self.inputs['objective'] + ', create a new ocaes model instead')
+            self.inputs['objective'] = objective
+            if self.instance is not None:
+                for name in compatible_objectives(objective):
+                    if name == objective:
+                        self.instance.component('objective_' + name).activate()
+                    else:
+                        self.instance.component('objective_' + name).deactivate()
+
+        if self.instance is None:  # sparse backend, assembling the arrays is cheap, always solved from scratch
+            self.lp = self.create_sparse_model()
+            self.basis_kept = False
+            start = time.time()
+            results = self.solve_lp()
+        else:
+            # reuse the solver, persistent interfaces only send the changed coefficients and keep their basis,
+            # other solvers start from the previous solution if they can
+            if self.solver is None and self.inputs['solver_io'] == 'memory' and not is_persistent(self.opt):
+                self.opt = set_profile(get_persistent_solver(self.opt), self.inputs['solver_profile'],
+                                       self.inputs['screening'])
+            # only a persistent solver that last solved this instance (not rebuilt by resolve) keeps its basis
+            self.basis_kept = is_persistent(self.opt) and self.solved[0] is self.opt and self.solved[1] is self.instance
+            start = time.time()
+            if is_persistent(self.opt) or not self.opt.warm_start_capable():
+                results = self.solve_instance()
+            else:
+                results = self.solve_instance(warmstart=True)
+        self.solver_time = time.time() - start
+        self.duality_gap = self.lp.duality_gap() if self.instance is None else duality_gap(self.opt)
+        self.iterations = self.lp.solution.nit if self.instance is None else iteration_count(self.opt)
+
+        print("Solver status               : " + str(results.solver.status))
+        print("Solver termination condition: " + str(results.solver.termination_condition))
+        print("Solver time [s]             : " + str(round(self.solver_time, 3)))
+        print("Solver iterations           : " + str(self.iterations))
+        print("Duality gap [-]             : " + str(self.duality_gap))
+
+        self.results = results
+        return results
+
+    def solve_lp(self):
+        # solve the sparse model with scipy's HiGHS, or with glpk or cbc through its MPS template (solver_io template,
+        # the solver argument, default the first installed), returns the results
+        solver = get_template_solver(self.solver) if self.inputs['solver_io'] == 'template' else None
+        if solver is None:
+            if self.inputs['solver_io'] == 'template':
+                print("Template solver             : none (HiGHS or glpk and cbc not found), solving in memory")
+            return self.lp.solve()
+        options = dict(solver_profiles[self.inputs['solver_profile']].get(solver, {}))
+        if self.inputs['screening']:
+            options.update(screening_tolerances.get(solver, {}))
+        name = self.inputs['objective'] + '_' + self.lp.objective + '_' + str(self.lp.n_rows)
+        template = get_template(self.get_series(), name)
+        results = self.lp.solve_template(template, solver, options)
+        print("Template values written     : " + str(template.patched))
+        return results
+
+    def solve_instance(self, **kwargs):
+        # solve the instance with the stored solver, returns the results
+        # the solution is loaded only if optimal, an infeasible or unbounded case returns its termination condition
+        # (the in-memory interfaces raise on loading a missing solution) and get_full_results() reports nan
+        # without crossover (barrier profile) the solver may not confirm optimality of the interior solution, it is
+        # loaded anyway so that get_full_results() reports it, see self.duality_gap for its quality
+        self.solved = (self.opt, self.instance)
+        results = self.opt.solve(self.instance, load_solutions=False, **kwargs)
+        if self.inputs['solver_profile'] == 'barrier':
+            accept_interior_solution(results, self.opt)
+        condition = results.solver.termination_condition
+        self.loaded = condition == TerminationCondition.optimal or (
+            self.inputs['solver_profile'] == 'barrier' and condition not in no_solution)
+        if self.loaded and is_persistent(self.opt):
+            self.opt.load_vars()
+        elif self.loaded:
+            self.instance.solutions.load_from(results)
+        return results
+
+    def get_parameters(self):
+        # single value model parameters, named as in the pyomo model
+        inputs = self.inputs
+        p = {}
+
+        # calculated inputs based on data
+        p['price_grid_average'] = self.data.price_dollarsPerMWh.mean()
+
+        # general
+        p['delta_t'] = inputs['delta_t']  # time step [hr]
+        p['T'] = len(self.data) + 1  # number of time steps
+
+        # power capacity [MW], initial values if optimized
+        p['X_wind'] = float(inputs['X_wind'])
+        p['X_well'] = float(inputs['X_well'])
+        p['X_cmp'] = float(inputs['X_cmp'])
+        p['X_exp'] = float(inputs['X_exp'])
+        p['X_storage'] = float(inputs['X_exp'])
+        p['X_dispatch'] = float(inputs['X_dispatch'])
+
+        # storage performance
+        p['E_well_duration'] = float(inputs['pwr2energy'])
+        p['E_well_min_fr'] = float(inputs['min_storage_fr'])  # minimum energy storage fraction [MWh]
+        p['E_well_max_fr'] = 1.0  # maximum energy storage fraction [MWh]
+        p['eta_storage_roundtrip'] = inputs['eta_storage']  # Storage round trip efficiency [-]
+        p['eta_storage_single'] = inputs['eta_storage'] ** 0.5  # Storage single direction eff. [-]
+
+        # capital costs [$/MW]
+        p['C_wind'] = float(inputs['C_wind'])
+        p['C_well'] = float(inputs['C_well'])
+        p['C_cmp'] = float(inputs['C_cmp'])
+        p['C_exp'] = float(inputs['C_exp'])
+
+        # variable costs [$/MWh]
+        p['V_wind'] = inputs['V_wind']
+        p['V_cmp'] = inputs['V_cmp']
+        p['V_exp'] = inputs['V_exp']
+
+        # fixed costs [$/MW-y]
+        p['F_wind'] = inputs['F_wind']
+        p['F_well'] = inputs['F_well']
+        p['F_cmp'] = inputs['F_cmp']
+        p['F_exp'] = inputs['F_exp']
+
+        # Real discount rate [fr]
+        i = inputs['interest'] - inputs['inflation']
+        p['i'] = i
+
+        # Loan lifetime [y]
+        p['L_wind'] = inputs['L_wind']
+        p['L_well'] = inputs['L_well']
+        p['L_cmp'] = inputs['L_cmp']
+        p['L_exp'] = inputs['L_exp']
+
+        # Capacity credits
+        p['CC_value'] = float(inputs['CC_value'])
+        p['CC_wind'] = float(inputs['CC_wind'])
+        p['CC_exp'] = float(inputs['CC_exp'])
+
+        # Power limits of the compressor and expander, the smaller of their own and the well capacity [MW]
+        p['P_cmp_max'] = min(p['X_cmp'], p['X_well'])
+        p['P_exp_max'] = min(p['X_exp'], p['X_well'])
+
+        # Capacity eligible for capacity credits [MW]
+        p['X_credit'] = min(p['X_wind'], p['X_wind'] * p['CC_wind'] + p['X_exp'] * p['CC_exp'])
+
+        # Capital Recovery Factor, real [fr]
+        p['CRF_wind'] = float(i + (i / ((1 + i) ** inputs['L_wind'] - 1.0)))
+        p['CRF_well'] = float(i + (i / ((1 + i) ** inputs['L_well'] - 1.0)))
+        p['CRF_cmp'] = float(i + (i / ((1 + i) ** inputs['L_cmp'] - 1.0)))
+        p['CRF_exp'] = float(i + (i / ((1 + i) ** inputs['L_exp'] - 1.0)))
+
+        return p
+
+    def get_series(self):
+        # time series model parameters, named as in the pyomo model
+        return {'P_wind_fr': self.data.P_wind_fr.values,  # wind power (fraction of capacity)
+                'price_grid': self.data.price_dollarsPerMWh.values,  # electricity price in $/MWh
+                'emissions_grid': self.data.emissions_tonCO2PerMWh.values}  # emissions [ton/MWh]
+
+    def aggregate_days(self):
+        # representative days (see representative_days) and the day sequence for inputs['representative_days'],
+        # None if every time step is solved
+        if self.inputs['representative_days'] is None:
+            return None
+        steps_per_day = int(round(24.0 / self.params['delta_t']))
+        if len(self.data) < steps_per_day:
+            raise ValueError('representative_days needs at least one day of data, ' + str(steps_per_day) +
+                             ' time steps')
+        return representative_days(self.get_series(), int(self.inputs['representative_days']), steps_per_day)
+
+    def validate_aggregation(self):
+        # error of the representative days against a solve of every time step (same data and inputs), returns the
+        # main single value results of both and their relative error, e.g. on one validation case of a sweep
+        inputs = self.inputs.copy()
+        inputs['representative_days'] = None
+        full = ocaes(self.data.copy(), inputs, solver=self.solver)
+        names = ['yearly_electricity_revenue', 'yearly_capacity_credit', 'yearly_costs', 'yearly_profit',
+                 'yearly_electricity_value', 'yearly_electricity', 'yearly_curtailment', 'yearly_exp_usage',
+                 'avoided_emissions', 'X_wind', 'X_well', 'X_dispatch']
+        report = pd.DataFrame({'aggregated': self.get_full_results()[1][names],
+                               'full': full.get_full_results()[1][names]})
+        report['error'] = (report.aggregated - report.full).abs() / report.full.abs().where(report.full != 0.0, 1.0)
+        print("Representative days         : " + str(self.inputs['representative_days']))
+        print(report)
+        objective = self.inputs['objective']
+        if objective in capacity_vars:
+            print('Warning - ' + objective + ' sizes ' + ', '.join(capacity_vars[objective]) +
+                  ' on representative days, the capacities are biased (see their errors), size on the full time series')
+        return report
+
+    def unit(self, name, scaling=None):
+        # factor from MW, MWh, $ and ton to the internal units of name (see scaling_factors), scaling defaults to
+        # inputs['scaling']
+        if scaling is None:
+            scaling = self.inputs['scaling']
+        if scaling:
+            return scaling_factors.get(name, 1.0)
+        return 1.0
+
+    def internal_units(self, values, scaling=None):
+        # dict of parameters or time series (see get_parameters and get_series) in the internal units of the model
+        return {name: value * self.unit(name, scaling) if name in scaling_factors else value
+                for name, value in values.items()}
+
+    def get_coefficient_ranges(self):
+        # smallest and largest absolute coefficients of the linear program (see ocaes_lp.coefficient_ranges, the same
+        # formulation as the pyomo model) in MW, MWh, $ and ton (before) and in the internal units (after scaling)
+        # builds the sparse model twice, on demand (computed in __init__ only with scaling or debug)
+        ranges = pd.DataFrame(columns=['before_min', 'before_max', 'after_min', 'after_max'], dtype='float64')
+        for when, scaling in [('before', False), ('after', self.inputs['scaling'])]:
+            for name, (smallest, largest) in self.create_sparse_model(scaling=scaling).coefficient_ranges().items():
+                ranges.loc[name, when + '_min'] = smallest
+                ranges.loc[name, when + '_max'] = largest
+        return ranges
+
+    def physical_units(self, df, s):
+        # time series (df) and single value (s) results from the internal units to MW, MWh, $ and ton
+        for name in scaling_factors:
+            if name in df:
+                df[name] = df[name] / self.unit(name)
+            if name in s:
+                s[name] = s[name] / self.unit(name)
+        return df, s
+
+    def create_sparse_model(self, objective_var=None, sense=None, avoided_emissions_min=None, scaling=None):
+        # objective_var and sense replace the objective of inputs['objective'] if given, scaling replaces
+        # inputs['scaling'] if given (see unit)
+        objective = self.inputs['objective']
+        if objective_var is None:
+            rule, objective_var, sense = objectives[objective]
+        if self.inputs['rolling_horizon'] is not None:
+            return self.create_rolling_model(objective_var, sense, scaling)
+        series, weights, day_sequence = self.get_series(), None, None
+        if self.aggregation is not None:
+            days, day_sequence = self.aggregation
+            steps_per_day = int(round(24.0 / self.params['delta_t']))
+            weights = day_weights(day_sequence, len(days), steps_per_day, len(series['P_wind_fr']))
+            series = reduce_series(series, days, steps_per_day)
+        structure = None
+        if self.inputs['model_cache'] is not None:
+            key = cache_key(dict(series, weights=weights, day_sequence=day_sequence) if weights is not None else series,
+                            objective, self.has_storage(), avoided_emissions_min is not None)
+            structure = load_structure(self.inputs['model_cache'], key)
+        lp = ocaes_lp(self.internal_units(self.params, scaling), self.internal_units(series, scaling),
+                      capacity_vars=capacity_vars.get(objective, []),
+                      arbitrage=objective == 'REVENUE_ARBITRAGE',
+                      simple_credit=objective in constant_dispatch,
+                      dispatch_const=objective in constant_dispatch,
+                      objective=objective_var, sense=sense,
+                      avoided_emissions_min=avoided_emissions_min, storage=self.has_storage(),
+                      options=screening_tolerances['scipy'] if self.inputs['screening'] else None,
+                      structure=structure, weights=weights, day_sequence=day_sequence,
+                      **solver_profiles[self.inputs['solver_profile']].get('scipy', {}))
+        if self.inputs['model_cache'] is not None and lp.structure is not structure:  # compiled, not cached yet
+            save_structure(self.inputs['model_cache'], key, lp.structure)
+        return lp
+
+    def create_rolling_model(self, objective_var, sense, scaling=None):
+        # sparse model solved as a rolling horizon of windows (see rolling_lp) for inputs['rolling_horizon']
+        objective = self.inputs['objective']
+        if objective in capacity_vars:
+            raise ValueError('rolling_horizon needs fixed capacities, ' + objective + ' optimizes ' +
+                             ', '.join(capacity_vars[objective]))
+        if self.aggregation is not None or self.inputs['solver_io'] == 'template':
+            raise ValueError('rolling_horizon can not be combined with representative_days or solver_io template')
+        window, lookahead = self.inputs['rolling_horizon']
+        return rolling_lp(self.internal_units(self.params, scaling), self.internal_units(self.get_series(), scaling),
+                          window=round(window / self.params['delta_t']),
+                          lookahead=round(lookahead / self.params['delta_t']),
+                          E_well_init_fr=self.inputs['initial_storage_fr'],
+                          arbitrage=objective == 'REVENUE_ARBITRAGE',
+                          simple_credit=objective in constant_dispatch,
+                          dispatch_const=objective in constant_dispatch,
+                          objective=objective_var, sense=sense, storage=self.has_storage(),
+                          options=screening_tolerances['scipy'] if self.inputs['screening'] else None,
+                          **solver_profiles[self.inputs['solver_profile']].get('scipy', {}))
+
+    def create_model(self):
+        inputs = self.inputs
+        objective = inputs['objective']
+        compact = inputs['compact']
+        storage = self.has_storage()
+        p = self.internal_units(self.params)
+
+        # fixed capacities are bounds of the variables they limit rather than one constraint per time step
+        fixed_storage = not any(name in capacity_vars.get(objective, []) for name in ['X_well', 'X_cmp', 'X_exp'])
+        fixed_wind = 'X_wind' not in capacity_vars.get(objective, [])
+
+        # ================================
+        # Move time series data to dictionaries to be compatible with pyomo indexed format
+        # ================================
+        T = p['T']  # number of time steps
+        series = self.internal_units(self.get_series())
+        if inputs['model_type'] == 'concrete':
+            # read straight from the arrays, components are built once on declaration
+            P_wind_init = from_array(series['P_wind_fr'])  # wind power (fraction of capacity)
+            price_init = from_array(series['price_grid'])  # electricity price in $/MWh
+            emissions_init = from_array(series['emissions_grid'])  # emissions [ton/MWh]
+        else:
+            P_wind_init = dict(zip(range(1, T), series['P_wind_fr']))  # wind power (fraction of capacity)
+            price_init = dict(zip(range(1, T), series['price_grid']))  # electricity price in $/MWh
+            emissions_init = dict(zip(range(1, T), series['emissions_grid']))  # emissions [ton/MWh]
+
         # ================================
         # Create Pyomo model
         # ================================
-        model = AbstractModel()
+        if inputs['model_type'] == 'concrete':
+            model = ConcreteModel()
+        else:
+            model = AbstractModel()
         # ----------------
         # Sets (fixed)
         # ----------------
@@ -174,251 +1037,284 @@ class ocaes:
         # Parameters (fixed inputs)
         # ----------------
         # calculated inputs based on data
-        model.P_wind_fr = Param(model.t, initialize=P_wind_dict)  # Fraction of wind power generated by farm
-        model.price_grid = Param(model.t,
-                                 initialize=price_dict)  # Grid locational marginal price (LMP) of electricity by hour
-        model.emissions_grid = Param(model.t, initialize=emissions_dict)  # Grid emissions by hour
-        model.price_grid_average = Param(initialize=data.price_dollarsPerMWh.mean())
+        model.P_wind_fr = Param(model.t, initialize=P_wind_init)  # Fraction of wind power generated by farm
+        model.price_grid = Param(model.t, initialize=price_init,
+                                 mutable=True)  # Grid locational marginal price (LMP) of electricity by hour
+        model.emissions_grid = Param(model.t, initialize=emissions_init)  # Grid emissions by hour
+        model.price_grid_average = Param(initialize=p['price_grid_average'], mutable=True)
 
         # general
-        model.delta_t = Param(initialize=inputs['delta_t'])  # time step [hr]
+        model.delta_t = Param(initialize=p['delta_t'])  # time step [hr]
         model.T = Param(initialize=T)  # number of time steps
 
-        # power capacity - wind [MW]
-        if not (inputs['objective'] == 'CD_FIX_DISP' or inputs['objective'] == 'CD_FIX_DISP_STOR'):
-            model.X_wind = Param(initialize=float(inputs['X_wind']))
-
-        # power capacity -storage [MW]
-        if not (inputs['objective'] == 'CD_FIX_DISP'):
-            model.X_well = Param(initialize=float(inputs['X_well']))
-            model.X_cmp = Param(initialize=float(inputs['X_cmp']))
-            model.X_exp = Param(initialize=float(inputs['X_exp']))
-            model.X_storage = Param(initialize=float(inputs['X_exp']))
-
-        # power capacity - dispatch [MW]
-        if not(inputs['objective'] == 'CD_FIX_WIND_STOR'):
-            model.X_dispatch = Param(initialize=float(inputs['X_dispatch']))
+        # mutable parameters can be changed by resolve() without rebuilding (see mutable_inputs)
+        # power capacity - wind, storage and dispatch [MW], unless optimized (see Variables)
+        for name in ['X_wind', 'X_well', 'X_cmp', 'X_exp', 'X_storage', 'X_dispatch']:
+            if name not in capacity_vars.get(objective, []):
+                model.add_component(name, Param(initialize=p[name], mutable=True))
+        if fixed_storage:
+            model.P_cmp_max = Param(initialize=p['P_cmp_max'], mutable=True)  # min(X_cmp, X_well)
+            model.P_exp_max = Param(initialize=p['P_exp_max'], mutable=True)  # min(X_exp, X_well)
 
         # storage performance
-        model.E_well_duration = Param(initialize=float(inputs['pwr2energy']))
-        model.E_well_min_fr = Param(initialize=float(inputs['min_storage_fr']))  # minimum energy storage fraction [MWh]
-        model.E_well_max_fr = Param(initialize=1.0)  # maximum energy storage fraction [MWh]
-        model.eta_storage_roundtrip = Param(initialize=inputs['eta_storage'])  # Storage round trip efficiency [-]
-        model.eta_storage_single = Param(initialize=inputs['eta_storage'] ** 0.5)  # Storage single direction eff. [-]
+        model.E_well_duration = Param(initialize=p['E_well_duration'], mutable=True)
+        model.E_well_min_fr = Param(initialize=p['E_well_min_fr'],
+                                    mutable=True)  # minimum energy storage fraction [MWh]
+        model.E_well_max_fr = Param(initialize=p['E_well_max_fr'])  # maximum energy storage fraction [MWh]
+        model.eta_storage_roundtrip = Param(initialize=p['eta_storage_roundtrip'],
+                                            mutable=True)  # Storage round trip efficiency [-]
+        model.eta_storage_single = Param(initialize=p['eta_storage_single'],
+                                         mutable=True)  # Storage single direction eff. [-]
 
         # capital costs [$/MW]
-        model.C_wind = Param(initialize=float(inputs['C_wind']))
-        model.C_well = Param(initialize=float(inputs['C_well']))
-        model.C_cmp = Param(initialize=float(inputs['C_cmp']))
-        model.C_exp = Param(initialize=float(inputs['C_exp']))
+        model.C_wind = Param(initialize=p['C_wind'], mutable=True)
+        model.C_well = Param(initialize=p['C_well'], mutable=True)
+        model.C_cmp = Param(initialize=p['C_cmp'], mutable=True)
+        model.C_exp = Param(initialize=p['C_exp'], mutable=True)
 
         # variable costs [$/MWh]
-        model.V_wind = Param(initialize=inputs['V_wind'])
-        model.V_cmp = Param(initialize=inputs['V_cmp'])
-        model.V_exp = Param(initialize=inputs['V_exp'])
+        model.V_wind = Param(initialize=p['V_wind'], mutable=True)
+        model.V_cmp = Param(initialize=p['V_cmp'], mutable=True)
+        model.V_exp = Param(initialize=p['V_exp'], mutable=True)
 
         # fixed costs [$/MW-y]
-        model.F_wind = Param(initialize=inputs['F_wind'])
-        model.F_well = Param(initialize=inputs['F_well'])
-        model.F_cmp = Param(initialize=inputs['F_cmp'])
-        model.F_exp = Param(initialize=inputs['F_exp'])
+        model.F_wind = Param(initialize=p['F_wind'], mutable=True)
+        model.F_well = Param(initialize=p['F_well'], mutable=True)
+        model.F_cmp = Param(initialize=p['F_cmp'], mutable=True)
+        model.F_exp = Param(initialize=p['F_exp'], mutable=True)
 
         # Real discount rate [fr]
-        i = inputs['interest'] - inputs['inflation']
-        model.i = Param(initialize=i)
+        model.i = Param(initialize=p['i'], mutable=True)
 
         # Loan lifetime [y]
-        model.L_wind = Param(initialize=inputs['L_wind'])
-        model.L_well = Param(initialize=inputs['L_well'])
-        model.L_cmp = Param(initialize=inputs['L_cmp'])
-        model.L_exp = Param(initialize=inputs['L_exp'])
+        model.L_wind = Param(initialize=p['L_wind'], mutable=True)
+        model.L_well = Param(initialize=p['L_well'], mutable=True)
+        model.L_cmp = Param(initialize=p['L_cmp'], mutable=True)
+        model.L_exp = Param(initialize=p['L_exp'], mutable=True)
 
         # Capacity credits
-        model.CC_value = Param(initialize=float(inputs['CC_value']))
-        model.CC_wind = Param(initialize=float(inputs['CC_wind']))
-        model.CC_exp = Param(initialize=float(inputs['CC_exp']))
+        model.CC_value = Param(initialize=p['CC_value'], mutable=True)
+        model.CC_wind = Param(initialize=p['CC_wind'], mutable=True)
+        model.CC_exp = Param(initialize=p['CC_exp'], mutable=True)
+        if objective not in constant_dispatch:
+            model.X_credit = Param(initialize=p['X_credit'], mutable=True)  # capacity eligible for credits [MW]
 
         # Capital Recovery Factor, real [fr]
-        model.CRF_wind = Param(initialize=float(i + (i / ((1 + i) ** inputs['L_wind'] - 1.0))))
-        model.CRF_well = Param(initialize=float(i + (i / ((1 + i) ** inputs['L_well'] - 1.0))))
-        model.CRF_cmp = Param(initialize=float(i + (i / ((1 + i) ** inputs['L_cmp'] - 1.0))))
-        model.CRF_exp = Param(initialize=float(i + (i / ((1 + i) ** inputs['L_exp'] - 1.0))))
+        model.CRF_wind = Param(initialize=p['CRF_wind'], mutable=True)
+        model.CRF_well = Param(initialize=p['CRF_well'], mutable=True)
+        model.CRF_cmp = Param(initialize=p['CRF_cmp'], mutable=True)
+        model.CRF_exp = Param(initialize=p['CRF_exp'], mutable=True)
 
         # ----------------
         # Variables (upper case)
         # ----------------
-        # power capacity - wind [MW]
-        if inputs['objective'] == 'CD_FIX_DISP' or inputs['objective'] == 'CD_FIX_DISP_STOR':
-            model.X_wind = Var(within=NonNegativeReals, initialize=float(inputs['X_wind']))
-
-        # power capacity -storage [MW]
-        if inputs['objective'] == 'CD_FIX_DISP':
-            model.X_well = Var(within=NonNegativeReals, initialize=float(inputs['X_well']))
-            model.X_cmp = Var(within=NonNegativeReals, initialize=float(inputs['X_cmp']))
-            model.X_exp = Var(within=NonNegativeReals, initialize=float(inputs['X_exp']))
-            model.X_storage = Var(within=NonNegativeReals, initialize=float(inputs['X_exp']))
-
-        # power capacity - dispatch [MW]
-        if inputs['objective'] == 'CD_FIX_WIND_STOR':
-            model.X_dispatch = Var(within=NonNegativeReals, initialize=float(inputs['X_dispatch']))
+        # power capacity - wind, storage and dispatch [MW], if optimized
+        for name in capacity_vars.get(objective, []):
+            model.add_component(name, Var(within=NonNegativeReals, initialize=p[name]))
 
         # Decision variables - energy flows
-        model.P_wind = Var(model.t, within=NonNegativeReals, initialize=0.0)  # OCAES compressor power in (>0, MW)
-        model.P_cmp = Var(model.t, within=NonNegativeReals, initialize=0.0)  # OCAES compressor power in (>0, MW)
-        model.P_exp = Var(model.t, within=NonNegativeReals, initialize=0.0)  # OCAES expander power out (>0, MW)
+        if not compact:  # otherwise an expression, see Expressions
+            model.P_wind = Var(model.t, within=NonNegativeReals, initialize=0.0)  # OCAES compressor power in (>0, MW)
+        if storage:  # otherwise zero, see Energy stored
+            model.P_cmp = Var(model.t, within=NonNegativeReals, initialize=0.0,  # OCAES compressor power in (>0, MW)
+                              bounds=rules.P_cmp_bounds if fixed_storage else None)
+            model.P_exp = Var(model.t, within=NonNegativeReals, initialize=0.0,  # OCAES expander power out (>0, MW)
+                              bounds=rules.P_exp_bounds if fixed_storage else None)
         model.P_curtail = Var(model.t, within=NonNegativeReals, initialize=0.0)  # Curtailed power (>0, MW)
-        model.P_grid_sell = Var(model.t, within=NonNegativeReals, initialize=0.0)  # Power sold to the grid (>0, MW)
-        model.P_grid_buy = Var(model.t, within=NonNegativeReals, initialize=0.0)  # Power bought from the grid (>0, MW)
+        model.P_grid_sell = Var(model.t, within=NonNegativeReals, initialize=0.0,  # Power sold to the grid (>0, MW)
+                                bounds=rules.P_grid_sell_bounds if fixed_wind else None)
+        if objective != 'REVENUE_ARBITRAGE':
+            P_grid_buy_bounds = rules.P_grid_buy_bounds_disabled
+        elif fixed_wind:
+            P_grid_buy_bounds = rules.P_grid_buy_bounds_enabled
+        else:
+            P_grid_buy_bounds = None
+        model.P_grid_buy = Var(model.t, within=NonNegativeReals, initialize=0.0,
+                               bounds=P_grid_buy_bounds)  # Power bought from the grid (>0, MW)
 
         # Energy stored
-        model.E_well = Var(model.t, within=NonNegativeReals, initialize=0.0)  # OCAES compressor power in (>0, MW)
-        model.E_well_init_fr = Var(within=NonNegativeReals, initialize=0.5,
-                                   bounds=(0.0, 1.0))  # Initial energy storage fraction
-        model.E_well_init = Var(within=NonNegativeReals, initialize=0.0)  # Initial energy storage (MWh)
-
-        # Avoided emissions
-        model.avoided_emissions = Var(within=Reals, initialize=0.0)  # within reservoir (>0, $)
-
-        # electricity (delivered to the grid and generated)
-        model.yearly_electricity = Var(within=Reals, initialize=0.0)  # scaled for one year
-        model.yearly_electricity_generated = Var(within=Reals, initialize=0.0)  # scaled for one year
-        model.yearly_electricity_purchased = Var(within=Reals, initialize=0.0)  # scaled for one year
-        model.yearly_curtailment = Var(within=Reals, initialize=0.0)  # scaled for one year
-        model.yearly_exp_usage = Var(within=Reals, initialize=0.0)  # scaled for one year
-        model.yearly_cmp_usage = Var(within=Reals, initialize=0.0)  # scaled for one year
-
-        # Economics
-        model.electricity_revenue = Var(model.t, within=Reals, initialize=0.0)
-        model.yearly_electricity_revenue = Var(within=Reals, initialize=0.0)
-        model.yearly_capacity_credit = Var(within=Reals, initialize=0.0)
-        model.yearly_total_revenue = Var(within=Reals, initialize=0.0)
-        model.yearly_costs = Var(within=Reals, initialize=0.0)
-        model.yearly_profit = Var(within=Reals, initialize=0.0)
-
-        # COVE
-        model.yearly_electricity_value = Var(within=Reals, initialize=0.0)
+        if storage:
+            E_well_min = p['E_well_min_fr'] * p['E_well_duration'] * p['X_well']  # lower bound (see E_well_bounds)
+            model.E_well = Var(model.t, within=NonNegativeReals, initialize=E_well_min,  # Energy stored (MWh)
+                               bounds=rules.E_well_bounds if fixed_storage else None)
+            model.E_well_init_fr = Var(within=NonNegativeReals, initialize=0.5,
+                                       bounds=(0.0, 1.0))  # Initial energy storage fraction
+            model.E_well_init = Var(within=NonNegativeReals, initialize=0.0)  # Initial energy storage (MWh)
+        else:
+            # no storage capacity (see has_storage), storage power and energy are zero
+            model.P_cmp = Param(model.t, initialize=0.0)
+            model.P_exp = Param(model.t, initialize=0.0)
+            model.E_well = Param(model.t, initialize=0.0)
+            model.E_well_init_fr = Param(initialize=0.0)
+            model.E_well_init = Param(initialize=0.0)
+
+        # Avoided emissions, electricity, economics and COVE, otherwise expressions (see Expressions)
+        if not compact:
+            # Avoided emissions
+            model.avoided_emissions = Var(within=Reals, initialize=0.0)  # within reservoir (>0, $)
+
+            # electricity (delivered to the grid and generated)
+            model.yearly_electricity = Var(within=Reals, initialize=0.0)  # scaled for one year
+            model.yearly_electricity_generated = Var(within=Reals, initialize=0.0)  # scaled for one year
+            model.yearly_electricity_purchased = Var(within=Reals, initialize=0.0)  # scaled for one year
+            model.yearly_curtailment = Var(within=Reals, initialize=0.0)  # scaled for one year
+            model.yearly_exp_usage = Var(within=Reals, initialize=0.0)  # scaled for one year
+            model.yearly_cmp_usage = Var(within=Reals, initialize=0.0)  # scaled for one year
+
+            # Economics
+            model.electricity_revenue = Var(model.t, within=Reals, initialize=0.0)
+            model.yearly_electricity_revenue = Var(within=Reals, initialize=0.0)
+            model.yearly_capacity_credit = Var(within=Reals, initialize=0.0)
+            model.yearly_total_revenue = Var(within=Reals, initialize=0.0)
+            model.yearly_costs = Var(within=Reals, initialize=0.0)
+            model.yearly_profit = Var(within=Reals, initialize=0.0)
+
+            # COVE
+            model.yearly_electricity_value = Var(within=Reals, initialize=0.0)
+
+        # ----------------
+        # Expressions
+        # ----------------
+        # compact formulation, wind power (see below)
+        if compact:
+            model.P_wind = Expression(model.t, rule=rules.P_wind_expr)
+
+        # time sums shared by the rules (total_<variable>[_<weight>]), each built once
+        for name in ['P_wind', 'P_cmp', 'P_exp', 'P_curtail', 'P_grid_sell', 'P_grid_buy']:
+            model.add_component('total_' + name, Expression(rule=rules.time_sum(name)))
+        for name in ['P_grid_sell', 'P_grid_buy']:
+            for weight in ['price_grid', 'emissions_grid']:
+                model.add_component('total_' + name + '_' + weight, Expression(rule=rules.time_sum(name, weight)))
+
+        # compact formulation, variables defined by an equality
+        if compact:
+            model.avoided_emissions = Expression(rule=rules.avoided_emissions_expr)
+            model.yearly_electricity = Expression(rule=rules.yearly_electricity_expr)
+            model.yearly_electricity_generated = Expression(rule=rules.yearly_electricity_generated_expr)
+            model.yearly_electricity_purchased = Expression(rule=rules.yearly_electricity_purchased_expr)
+            model.yearly_curtailment = Expression(rule=rules.yearly_curtailment_expr)
+            model.yearly_exp_usage = Expression(rule=rules.yearly_exp_usage_expr)
+            model.yearly_cmp_usage = Expression(rule=rules.yearly_cmp_usage_expr)
+            model.electricity_revenue = Expression(model.t, rule=rules.electricity_revenue_expr)
+            model.yearly_electricity_revenue = Expression(rule=rules.yearly_electricity_revenue_expr)
+            if objective in constant_dispatch:
+                model.yearly_capacity_credit = Expression(rule=rules.yearly_capacity_credit_simple_expr)
+            else:
+                model.yearly_capacity_credit = Expression(rule=rules.yearly_capacity_credit_expr)
+            model.yearly_total_revenue = Expression(rule=rules.yearly_total_revenue_expr)
+            model.yearly_costs = Expression(rule=rules.yearly_costs_expr)
+            model.yearly_profit = Expression(rule=rules.yearly_profit_expr)
+            model.yearly_electricity_value = Expression(rule=rules.yearly_electricity_value_expr)
 
         # ----------------
         # Constraints (prefixed with cnst)
         # ----------------
         # wind power
-        model.cnst_pwr_wind = Constraint(model.t, rule=rules.pwr_wind)
+        if not compact:
+            model.cnst_pwr_wind = Constraint(model.t, rule=rules.pwr_wind)
 
         # capacity
-        if inputs['objective'] == 'CD_FIX_DISP':
+        if objective == 'CD_FIX_DISP':
             model.cnst_cap_well_var = Constraint(rule=rules.capacity_well_var)
             model.cnst_cap_cmp_var = Constraint(rule=rules.capacity_cmp_var)
             model.cnst_cap_exp_var = Constraint(rule=rules.capacity_exp_var)
 
-        # capacity - power
-        model.cnst_pwr_capacity_cmp = Constraint(model.t, rule=rules.pwr_capacity_cmp)
-        model.cnst_pwr_capacity_exp = Constraint(model.t, rule=rules.pwr_capacity_exp)
-        model.cnst_pwr_capacity_well_in = Constraint(model.t, rule=rules.pwr_capacity_well_in)
-        model.cnst_pwr_capacity_well_out = Constraint(model.t, rule=rules.pwr_capacity_well_out)
-        model.cnst_pwr_grid_sell = Constraint(model.t, rule=rules.pwr_grid_sell)
+        # capacity - power, only for optimized capacities (fixed capacities are variable bounds)
+        if not fixed_storage:
+            model.cnst_pwr_capacity_cmp = Constraint(model.t, rule=rules.pwr_capacity_cmp)
+            model.cnst_pwr_capacity_exp = Constraint(model.t, rule=rules.pwr_capacity_exp)
+            model.cnst_pwr_capacity_well_in = Constraint(model.t, rule=rules.pwr_capacity_well_in)
+            model.cnst_pwr_capacity_well_out = Constraint(model.t, rule=rules.pwr_capacity_well_out)
+        if not fixed_wind:
+            model.cnst_pwr_grid_sell = Constraint(model.t, rule=rules.pwr_grid_sell)
         model.cnst_pwr_grid_limit = Constraint(model.t, rule=rules.pwr_grid_limit)
-        if inputs['objective'] == 'REVENUE_ARBITRAGE':
+        if objective == 'REVENUE_ARBITRAGE' and not fixed_wind:
             model.cnst_pwr_grid_buy = Constraint(model.t, rule=rules.pwr_grid_buy_enabled)
-        else:
-            model.cnst_pwr_grid_buy = Constraint(model.t, rule=rules.pwr_grid_buy_disabled)
 
         # capacity - energy
-        model.cnst_energy_capacity_well_min = Constraint(model.t, rule=rules.energy_capacity_well_min)
-        model.cnst_energy_capacity_well_max = Constraint(model.t, rule=rules.energy_capacity_well_max)
+        if not fixed_storage:
+            model.cnst_energy_capacity_well_min = Constraint(model.t, rule=rules.energy_capacity_well_min)
+            model.cnst_energy_capacity_well_max = Constraint(model.t, rule=rules.energy_capacity_well_max)
 
         # power balance
         model.cnst_power_balance = Constraint(model.t, rule=rules.power_balance)
 
         # energy stored
-        model.cnst_energy_stored_init = Constraint(rule=rules.energy_stored_init)
-        model.cnst_energy_stored = Constraint(model.t, rule=rules.energy_stored)
-        model.cnst_energy_stored_final = Constraint(rule=rules.energy_stored_final)
-
-        # emissions
-        model.cnst_emissions = Constraint(rule=rules.emissions)
-
-        # electricity
-        model.cnst_yearly_electricity = Constraint(rule=rules.yearly_electricity)
-        model.cnst_yearly_electricity_generated = Constraint(rule=rules.yearly_electricity_generated)
-        model.cnst_yearly_electricity_purchased = Constraint(rule=rules.yearly_electricity_purchased)
-        model.cnst_yearly_curtailment = Constraint(rule=rules.yearly_curtailment)
-        model.cnst_yearly_exp_usage = Constraint(rule=rules.yearly_exp_usage)
-        model.cnst_yearly_cmp_usage = Constraint(rule=rules.yearly_cmp_usage)
-
-        # economics
-        model.cnst_electricity_revenue = Constraint(model.t, rule=rules.electricity_revenue)
-        model.cnst_yearly_electricity_revenue = Constraint(rule=rules.yearly_electricity_revenue)
-        if inputs['objective'] == 'CD_FIX_DISP' or inputs['objective'] == 'CD_FIX_WIND_STOR' or \
-                inputs['objective'] == 'CD_FIX_DISP_STOR' or inputs['objective'] == 'CD_FIX_DISP_WIND_STOR':
-            model.cnst_yearly_capacity_credit_simple = Constraint(rule=rules.yearly_capacity_credit_simple)
-        else:
-            model.cnst_yearly_capacity_credit = Constraint(rule=rules.yearly_capacity_credit)
-        model.cnst_yearly_total_revenue = Constraint(rule=rules.yearly_total_revenue)
-        model.cnst_yearly_costs = Constraint(rule=rules.yearly_costs)
-        model.cnst_yearly_profit = Constraint(rule=rules.yearly_profit)
+        if storage:
+            model.cnst_energy_stored_init = Constraint(rule=rules.energy_stored_init)
+            model.cnst_energy_stored = Constraint(model.t, rule=rules.energy_stored)
+            model.cnst_energy_stored_final = Constraint(rule=rules.energy_stored_final)
+
+        # emissions, electricity, economics and COVE, only the defining constraints of variables (see Expressions)
+        if not compact:
+            # emissions
+            model.cnst_emissions = Constraint(rule=rules.emissions)
+
+            # electricity
+            model.cnst_yearly_electricity = Constraint(rule=rules.yearly_electricity)
+            model.cnst_yearly_electricity_generated = Constraint(rule=rules.yearly_electricity_generated)
+            model.cnst_yearly_electricity_purchased = Constraint(rule=rules.yearly_electricity_purchased)
+            model.cnst_yearly_curtailment = Constraint(rule=rules.yearly_curtailment)
+            model.cnst_yearly_exp_usage = Constraint(rule=rules.yearly_exp_usage)
+            model.cnst_yearly_cmp_usage = Constraint(rule=rules.yearly_cmp_usage)
+
+            # economics
+            model.cnst_electricity_revenue = Constraint(model.t, rule=rules.electricity_revenue)
+            model.cnst_yearly_electricity_revenue = Constraint(rule=rules.yearly_electricity_revenue)
+            if objective in constant_dispatch:
+                model.cnst_yearly_capacity_credit_simple = Constraint(rule=rules.yearly_capacity_credit_simple)
+            else:
+                model.cnst_yearly_capacity_credit = Constraint(rule=rules.yearly_capacity_credit)
+            model.cnst_yearly_total_revenue = Constraint(rule=rules.yearly_total_revenue)
+            model.cnst_yearly_costs = Constraint(rule=rules.yearly_costs)
+            model.cnst_yearly_profit = Constraint(rule=rules.yearly_profit)
 
-        # COVE
-        model.cnst_yearly_electricity_value = Constraint(rule=rules.yearly_electricity_value)
+            # COVE
+            model.cnst_yearly_electricity_value = Constraint(rule=rules.yearly_electricity_value)
 
         # Constant Dispatch
-        if inputs['objective'] == 'CD_FIX_DISP' or inputs['objective'] == 'CD_FIX_WIND_STOR' or \
-                inputs['objective'] == 'CD_FIX_DISP_STOR' or inputs['objective'] == 'CD_FIX_DISP_WIND_STOR':
+        if objective in constant_dispatch:
             model.cnst_pwr_dispatch_const = Constraint(model.t, rule=rules.pwr_dispatch_const)
 
         # ----------------
         # Objective
         # ----------------
-        if inputs['objective'] == 'COVE' or inputs['objective'] == 'CD_FIX_WIND_STOR':
-            model.objective = Objective(sense=maximize, rule=rules.objective_COVE)
-        elif inputs['objective'] == 'PROFIT':
-            model.objective = Objective(sense=maximize, rule=rules.objective_PROFIT)
-        elif inputs['objective'] == 'CD_FIX_DISP' or inputs['objective'] == 'CD_FIX_DISP_STOR' or \
-                inputs['objective'] == 'CD_FIX_DISP_WIND_STOR':
-            model.objective = Objective(sense=minimize, rule=rules.objective_COST)
-        else:  # REVENUE, REVENUE_ARBITRAGE
-            model.objective = Objective(sense=maximize, rule=rules.objective_revenue)
+        # all objectives that share this model structure are declared, only the selected objective is active
+        barrier = inputs['solver_profile'] == 'barrier'
+        for name in compatible_objectives(objective):
+            rule, objective_var, sense = objectives[name]
+            model.add_component('objective_' + name, objective_component(rule, sense, barrier))
+            if name != objective:
+                model.component('objective_' + name).deactivate()
 
-        # ----------------
-        # Run
-        # ----------------
-
-        # create instance
-        if inputs['debug']:
-            instance = model.create_instance(report_timing=True)
-        else:
-            instance = model.create_instance(report_timing=False)
-        instance.preprocess()
-
-        # set solver
-        if SolverFactory('gurobi').available():
-            opt = SolverFactory("gurobi")
-        elif SolverFactory('cplex').available():
-            opt = SolverFactory("cplex")
-        elif SolverFactory('glpk').available():
-            opt = SolverFactory("glpk")
-        elif SolverFactory('cbc').available():
-            opt = SolverFactory("cbc")
-        else:
-            print('Warning could not find a suitable solver')
-
-        # solve
-        results = opt.solve(instance)
-        print("Solver status               : " + str(results.solver.status))
-        print("Solver termination condition: " + str(results.solver.termination_condition))
-
-        # Store model, instance and results
-        self.model = model
-        self.instance = instance
-        self.results = results
+        return model
 
     def get_full_results(self):
+        # results in MW, MWh, $ and ton, whatever the internal units (see scaling_factors)
+        if self.instance is None:  # sparse backend
+            df, s = self.lp.get_full_results()
+            return self.physical_units(df, s)
 
         s = pd.Series(dtype='float64')
         df = pd.DataFrame()
 
-        # Variable values
+        # Variable values, nan if the last solve was not loaded (see solve_instance)
         for v in self.instance.component_objects(Var, active=True):
             value_dict = v.extract_values()
+            if not self.loaded:
+                value_dict = dict.fromkeys(value_dict, np.nan)
+            if len(value_dict) == 1:  # single value
+                s[v.name] = value_dict[None]
+                # if single value, put in series
+            else:
+                df = pd.concat([df, pd.DataFrame.from_dict(value_dict, orient='index', columns=[v.name])], axis=1,
+                               sort=False)
+
+        # Expression values (compact formulation)
+        for v in self.instance.component_objects(Expression, active=True):
+            if v.name.startswith('total_'):  # time sums shared by the rules
+                continue
+            value_dict = {index: value(e) if self.loaded else np.nan for index, e in v.items()}
             if len(value_dict) == 1:  # single value
                 s[v.name] = value_dict[None]
                 # if single value, put in series
@@ -435,7 +1331,7 @@ class ocaes:
             else:
                 df = pd.concat([df, pd.DataFrame.from_dict(value_dict, orient='index', columns=[v.name])],
                                axis=1, sort=False)
-        return df, s
+        return self.physical_units(df, s)
 
     def calculate_LCOE(self, s):
         return s['yearly_costs'] / s['yearly_electricity']
@@ -0,0 +1,58 @@
+import numpy as np
+from scipy.cluster.vq import kmeans2
+
+# time series that the days are clustered on, each scaled by its standard deviation
+cluster_series = ['price_grid', 'P_wind_fr', 'emissions_grid']
+
+
+def representative_days(series, n_days, steps_per_day, seed=0):
+    """
+    Representative days of the time series, by k-means clustering of the daily profiles
+
+    series        : dict of time series parameters (numpy arrays), named as in the pyomo model
+    n_days        : number of representative days (clusters), at most the number of whole days
+    steps_per_day : time steps in a day
+    seed          : seed of the k-means initialization, the same days are chosen on every run
+
+    returns the representative days (index of the day in the time series, the member of each cluster closest to its
+    center, in order) and the day sequence (index into the representative days for each day of the time series), a
+    last partial day (e.g. 8761 hours) is not clustered but represented by the closest center over its time steps
+    """
+    n_steps = len(series['P_wind_fr'])
+    n = n_steps // steps_per_day  # whole days
+    scale = {name: max(np.std(series[name]), 1e-12) for name in cluster_series}
+    features = np.hstack([series[name][:n * steps_per_day].reshape(n, steps_per_day) / scale[name]
+                          for name in cluster_series])
+    centers, labels = kmeans2(features, min(n_days, n), minit='++', seed=seed)
+
+    # the member closest to each center represents the cluster, clusters left empty by k-means are dropped
+    clusters = np.unique(labels)
+    days = np.array([np.flatnonzero(labels == c)[np.argmin(((features[labels == c] - centers[c]) ** 2).sum(axis=1))]
+                     for c in clusters])
+
+    # last partial day
+    remainder = n_steps - n * steps_per_day
+    if remainder > 0:
+        partial = np.concatenate([series[name][n * steps_per_day:] / scale[name] for name in cluster_series])
+        columns = (np.arange(len(cluster_series))[:, None] * steps_per_day + np.arange(remainder)).ravel()
+        nearest = clusters[np.argmin(((centers[clusters][:, columns] - partial) ** 2).sum(axis=1))]
+        labels = np.append(labels, nearest)
+
+    order = np.argsort(days)
+    sequence = np.argsort(order)[np.searchsorted(clusters, labels)]
+    return days[order], sequence
+
+
+def reduce_series(series, days, steps_per_day):
+    # time series of the representative days only, one day after the other
+    return {name: values[(days[:, None] * steps_per_day + np.arange(steps_per_day)).ravel()]
+            for name, values in series.items()}
+
+
+def day_weights(sequence, n_days, steps_per_day, n_steps):
+    # weight of each time step of the representative days, the number of days of the n_steps time steps (the last
+    # one can be partial) that it stands for
+    weights = np.zeros((n_days, steps_per_day))
+    for day, representative in enumerate(sequence):
+        weights[representative, :min(steps_per_day, n_steps - day * steps_per_day)] += 1.0
+    return weights.ravel()
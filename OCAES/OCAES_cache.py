@@ -0,0 +1,49 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+from OCAES.OCAES_sparse import model_version
+
+# arrays of a compiled structure (see OCAES_sparse.compile_structure), one .npy file each
+structure_arrays = ['indptr', 'indices', 'position']
+
+
+def series_hash(series):
+    # hash of the time series parameters (see ocaes.get_series), identifies the time series of a cached model
+    h = hashlib.sha1()
+    for name in sorted(series):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(series[name], dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def cache_key(series, objective, storage=True, bounded=False):
+    # key of the compiled structure of a model: time series content, objective, storage and avoided emissions bound
+    # (see ocaes_lp) and the model version, so that a changed formulation never reads an old structure
+    key = series_hash(series)[:16] + '_' + objective + '_v' + str(model_version)
+    if not storage:
+        key += '_no_storage'
+    if bounded:
+        key += '_bounded'
+    return key
+
+
+def load_structure(directory, key):
+    # compiled structure from the cache in directory, memory mapped (the processes of a sweep share the pages),
+    # None if it is not cached
+    path = os.path.join(directory, key)
+    if not all(os.path.exists(os.path.join(path, name + '.npy')) for name in structure_arrays):
+        return None
+    return {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in structure_arrays}
+
+
+def save_structure(directory, key, structure):
+    # store a compiled structure in the cache in directory, each file is written under a temporary name and then
+    # renamed, parallel processes never read a partly written file
+    path = os.path.join(directory, key)
+    os.makedirs(path, exist_ok=True)
+    for name in structure_arrays:
+        handle, temporary = tempfile.mkstemp(dir=path, suffix='.npy')
+        with os.fdopen(handle, 'wb') as f:
+            np.save(f, structure[name])
+        os.replace(temporary, os.path.join(path, name + '.npy'))
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def greedy_dispatch(params, series, arbitrage, dispatch_const, storage=True, price_quantiles=(0.25, 0.75)):
+    """
+    Greedy storage dispatch, a fast feasible starting point for the OCAES linear program
+
+    Steps through time once: charges on low prices (or wind in excess of the constant dispatch), discharges on high
+    prices (or to make up the constant dispatch), within the power and energy limits of the storage. Storage starts at
+    its minimum level and is brought back to it by the last time step, as the model requires.
+
+    params          : dict of single value parameters, named as in the pyomo model
+    series          : dict of time series parameters (numpy arrays), named as in the pyomo model
+    arbitrage       : allow power to be purchased from the grid (for charging)
+    dispatch_const  : hold the power delivered to the grid at X_dispatch
+    storage         : False leaves the storage power and energy at zero
+    price_quantiles : charge below the lower and discharge above the upper price quantile
+
+    returns a dict of time series (P_wind, P_cmp, P_exp, P_curtail, P_grid_sell, P_grid_buy, E_well) and single values
+    (E_well_init_fr, E_well_init), named as in the pyomo model. Constant dispatch can be infeasible (not enough wind
+    and storage), the power delivered to the grid is then less than X_dispatch.
+    """
+    p = params
+    dt = p['delta_t']
+    wind = p['X_wind'] * series['P_wind_fr']
+    price = series['price_grid']
+    N = len(wind)  # number of time steps
+
+    # storage limits
+    if storage:
+        eta = p['eta_storage_single']
+        P_cmp_max, P_exp_max = p['P_cmp_max'], p['P_exp_max']
+        E_min = p['E_well_min_fr'] * p['E_well_duration'] * p['X_well']
+        E_max = p['E_well_max_fr'] * p['E_well_duration'] * p['X_well']
+    else:
+        eta, P_cmp_max, P_exp_max, E_min, E_max = 1.0, 0.0, 0.0, 0.0, 0.0
+
+    # highest level from which the storage can still be emptied to E_min by the last time step
+    E_cap = np.minimum(E_max, E_min + (N - 1 - np.arange(N)) * dt * P_exp_max / eta)
+
+    # price thresholds, cycling only pays off if the round trip losses are covered
+    low, high = np.quantile(price, price_quantiles)
+    if high * eta ** 2 <= low:
+        low, high = -np.inf, np.inf
+
+    cmp = np.zeros(N)
+    exp = np.zeros(N)
+    sell = np.zeros(N)
+    buy = np.zeros(N)
+    E = np.full(N, E_min)
+    for t in range(1, N):  # the first time step sets the initial level, its power does not change the level
+        room = max(E_cap[t] - E[t - 1], 0.0) / (dt * eta)  # charge that still fits [MW]
+        stored = (E[t - 1] - E_min) * eta / dt  # discharge that is left [MW]
+        forced = max(E[t - 1] - E_cap[t], 0.0) * eta / dt  # discharge needed to reach E_min in time [MW]
+
+        if dispatch_const:
+            target = p['X_dispatch']
+            if wind[t] >= target:
+                cmp[t] = min(P_cmp_max, room, wind[t] - target)
+            exp[t] = min(P_exp_max, stored, max(target - wind[t], forced))
+            sell[t] = min(target, wind[t] + exp[t] - cmp[t])
+        else:
+            limit = p['X_wind']  # grid connection [MW]
+            if price[t] <= low or price[t] < 0.0:
+                cmp[t] = min(P_cmp_max, room, wind[t] + (limit if arbitrage else 0.0))
+            if price[t] >= high or forced > 0.0:
+                exp[t] = min(P_exp_max, stored, max(limit - wind[t], forced))
+            net = wind[t] + exp[t] - cmp[t]
+            buy[t] = max(-net, 0.0)
+            sell[t] = min(max(net, 0.0), limit) if price[t] >= 0.0 else 0.0
+        E[t] = E[t - 1] + dt * eta * cmp[t] - dt * exp[t] / eta
+
+    # rounding can leave the balance a little below zero, or the level a little outside its limits
+    start = {'P_wind': wind, 'P_cmp': cmp, 'P_exp': exp, 'P_grid_sell': sell, 'P_grid_buy': buy,
+             'E_well': np.clip(E, E_min, E_max), 'P_curtail': np.maximum(wind + exp + buy - sell - cmp, 0.0)}
+    start['E_well_init_fr'] = p['E_well_min_fr'] if storage else 0.0
+    start['E_well_init'] = E_min
+    return start
@@ -0,0 +1,70 @@
+import numpy as np
+
+# objectives with the dispatch and storage fixed (parameters), the only ones that can be found infeasible before solving
+precheck_objectives = ['CD_FIX_DISP_STOR', 'CD_FIX_DISP_WIND_STOR']
+
+
+class InfeasibleDispatchError(ValueError):
+    # raised in place of building and solving a model that fails the precheck (see dispatch_precheck)
+    pass
+
+
+def dispatch_precheck(params, series, wind_fixed=True, storage=True, rtol=1e-4):
+    """
+    Feasibility precheck of constant dispatch, before the OCAES linear program is built
+
+    Checks conditions every feasible solution meets, with the best case storage operation in each time step: the wind
+    farm (if fixed) can carry the dispatch to the grid, the expander covers the largest shortfall of wind, and no
+    window of time (wrapping around, as the storage returns to its initial level) drains more energy than the storage
+    holds. An optimized wind farm (wind_fixed False) is taken as unlimited, only calm hours then count.
+
+    params     : dict of single value parameters, named as in the pyomo model
+    series     : dict of time series parameters (numpy arrays), named as in the pyomo model
+    wind_fixed : False if X_wind is optimized
+    storage    : False if there is no storage (see ocaes.has_storage)
+    rtol       : checks met or missed by less than rtol (fraction of the dispatch power or of the storage energy) are
+                 borderline
+
+    returns the status and the check with the least slack, status is infeasible (a check is missed), borderline or
+    passed, borderline and passed cases still need to be solved to find out if they are feasible
+    """
+    p = params
+    dt = p['delta_t']
+    X_dispatch = p['X_dispatch']
+    fr = series['P_wind_fr']
+
+    # storage limits
+    if storage:
+        eta = p['eta_storage_single']
+        P_cmp_max, P_exp_max = p['P_cmp_max'], p['P_exp_max']
+        E_range = (p['E_well_max_fr'] - p['E_well_min_fr']) * p['E_well_duration'] * p['X_well']
+    else:
+        eta, P_cmp_max, P_exp_max, E_range = 1.0, 0.0, 0.0, 0.0
+
+    # shortfall of wind below the dispatch [MW], negative for a surplus
+    if wind_fixed:
+        shortfall = X_dispatch - p['X_wind'] * fr
+    else:
+        shortfall = np.where(fr > 0.0, -np.inf, X_dispatch)
+
+    # largest energy gain of the storage in each time step [MWh], surplus compressed and shortfall expanded, the first
+    # time step sets the initial level (see rules.energy_stored)
+    gain = dt * (eta * np.minimum(P_cmp_max, np.maximum(-shortfall[1:], 0.0)) -
+                 np.maximum(shortfall[1:], 0.0) / eta)
+    cumulative = np.concatenate([[0.0], np.cumsum(np.concatenate([gain, gain]))])  # two cycles, to wrap around
+    drawdown = np.max(np.maximum.accumulate(cumulative) - cumulative)
+
+    # slack of each check, as a fraction of the dispatch power or of the storage energy
+    power = max(X_dispatch, 1e-9)
+    energy = max(E_range, dt * power)
+    slack = {'power to the grid (X_dispatch <= X_wind)': (p['X_wind'] - X_dispatch) / power if wind_fixed else np.inf,
+             'expander power (shortfall <= P_exp_max)': (P_exp_max - np.max(shortfall)) / power,
+             'energy over the time series (gain >= loss)': np.sum(gain) / energy,
+             'energy over any window (drawdown <= storage)': (E_range - drawdown) / energy}
+
+    check = min(slack, key=slack.get)
+    if slack[check] < -rtol:
+        return 'infeasible', check
+    if slack[check] <= rtol:
+        return 'borderline', check
+    return 'passed', check
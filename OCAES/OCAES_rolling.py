@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import OptimizeResult
+from OCAES.OCAES_sparse import ocaes_lp, series_variables, series_parameters
+
+
+class rolling_lp:
+    """
+    OCAES linear program of a long time series (e.g. several years) solved as a rolling horizon of overlapping windows
+
+    Each window is an ocaes_lp of window + lookahead time steps. Only its first window time steps are committed, the
+    lookahead keeps the storage from being emptied at the end of every window and is solved again by the next window.
+    A window starts from the storage level committed by the previous one (its first time step is the last committed
+    one, so that the storage balance is the same as in the full model). The initial level is fixed (E_well_init_fr),
+    the windows that reach the end of the time series return to it, as the full model does. Only one window is built
+    at a time, the memory of the linear program is bounded by the window size rather than the length of the time series.
+    Capacities have to be fixed (objectives without capacity_vars). The windows do not see past their lookahead, a
+    constant dispatch that relies on energy stored over a longer time can be infeasible for a window while the full
+    model is not, solve() then raises a RuntimeError.
+
+    params    : dict of single value parameters of the whole time series, named as in the pyomo model
+    series    : dict of time series parameters (numpy arrays), named as in the pyomo model
+    window    : time steps committed by each window
+    lookahead : time steps solved past the committed ones, they are solved again by the next window, at least one
+                with storage
+    E_well_init_fr : initial (and final) storage level, fraction of the well energy
+    kwargs    : arguments of each ocaes_lp (see ocaes_lp), without the capacity_vars
+    """
+
+    def __init__(self, params, series, window, lookahead, E_well_init_fr=0.5, **kwargs):
+        self.params = params
+        self.series = series
+        self.window = int(window)
+        self.lookahead = int(lookahead)
+        self.kwargs = kwargs
+        self.simple_credit = kwargs['simple_credit']
+        self.storage = kwargs.get('storage', True)
+        self.N = len(series['P_wind_fr'])
+        if self.window < 1 or self.lookahead < 0:
+            raise ValueError('rolling_horizon needs a window of at least one time step and a lookahead of zero or more')
+        if self.storage and self.lookahead == 0:
+            raise ValueError('rolling_horizon needs a lookahead of at least one time step with storage, otherwise '
+                             'every window empties the storage at its end')
+        self.E_well_init_fr = float(E_well_init_fr)
+        if not params['E_well_min_fr'] <= self.E_well_init_fr <= params['E_well_max_fr']:
+            raise ValueError('initial_storage_fr of ' + str(self.E_well_init_fr) + ' is outside of the storage levels')
+        self.windows = [(start, min(start + self.window, self.N), min(start + self.window + self.lookahead, self.N))
+                        for start in range(0, self.N, self.window)]  # (start, end of committed, end of solved)
+
+    def create_window(self, start, end, E_well_init=None, E_well_final=None):
+        # ocaes_lp of the time steps start to end, from the fixed initial level E_well_init (optimized if None) and to
+        # E_well_final at its last time step (free if None)
+        params = dict(self.params, T=end - start + 1)
+        series = {name: values[start:end] for name, values in self.series.items()}
+        return ocaes_lp(params, series, capacity_vars=[], E_well_init=E_well_init, cyclic=False,
+                        E_well_final=E_well_final, **self.kwargs)
+
+    def solve(self):
+        # solve the windows one after the other, returns the pyomo style results of the last window, the committed
+        # time steps are kept for get_full_results, raises a RuntimeError if a window is not solved to optimality
+        self.values = {name: np.zeros(self.N) for name in series_variables}
+        self.s = None  # single value results of the first window
+        self.gaps = []
+        p = self.params
+        E_well_energy = p['E_well_duration'] * p['X_well']
+        E_min, E_max = p['E_well_min_fr'] * E_well_energy, p['E_well_max_fr'] * E_well_energy
+        E_init = self.E_well_init_fr * E_well_energy if self.storage else None
+        iterations = 0
+        for start, commit, end in self.windows:
+            # from the last committed time step, except the first window
+            first = max(start - 1, 0)
+            E_well_init = E_init
+            if start > 0 and self.storage:
+                E_well_init = min(max(self.values['E_well'][first], E_min), E_max)
+            E_well_final = E_init if end == self.N else None
+            lp = self.create_window(first, end, E_well_init, E_well_final)
+            results = lp.solve()
+            iterations += lp.solution.nit
+            self.gaps.append(lp.duality_gap())
+            if lp.solution.status != 0:
+                raise RuntimeError('rolling_horizon window of time steps ' + str(start + 1) + ' to ' + str(end) +
+                                   ' was not solved to optimality: ' + str(lp.solution.message))
+            df, s = lp.get_full_results()
+            for name in series_variables:
+                self.values[name][start:commit] = df[name].values[start - first:commit - first]
+            if self.s is None:
+                self.s = s
+        self.solution = OptimizeResult(status=0, nit=iterations, message=lp.solution.message, success=True)
+        return results
+
+    def duality_gap(self):
+        # largest gap of the windows
+        return max(self.gaps) if not np.isnan(self.gaps).any() else np.nan
+
+    def coefficient_ranges(self):
+        # smallest and largest coefficients over the windows (see ocaes_lp.coefficient_ranges), built one at a time
+        ranges = {}
+        for start, commit, end in self.windows:
+            for name, (smallest, largest) in self.create_window(max(start - 1, 0), end).coefficient_ranges().items():
+                lowest, highest = ranges.get(name, (np.nan, np.nan))
+                ranges[name] = (np.fmin(lowest, smallest), np.fmax(highest, largest))
+        return ranges
+
+    def get_full_results(self):
+        # results in the same layout as ocaes.get_full_results() for the pyomo model, the committed time steps of the
+        # windows one after the other and the yearly totals over the whole time series
+        df = pd.DataFrame(index=range(1, self.N + 1))
+        for name in series_variables:
+            df[name] = self.values[name]
+        for name in series_parameters:
+            df[name] = self.series[name]
+
+        p = self.params
+        dt = p['delta_t']
+        scale = 8760 / (p['T'] * dt)  # scale to one year
+        price, emissions = self.series['price_grid'], self.series['emissions_grid']
+        sell, buy = self.values['P_grid_sell'], self.values['P_grid_buy']
+        s = self.s.copy()
+        for name in s.index:
+            if name in p:
+                s[name] = p[name]
+        s['avoided_emissions'] = dt * np.sum((sell - buy) * emissions)
+        s['yearly_electricity'] = scale * np.sum(sell)
+        s['yearly_electricity_generated'] = scale * np.sum(self.values['P_wind'])
+        s['yearly_electricity_purchased'] = scale * np.sum(buy)
+        s['yearly_curtailment'] = scale * np.sum(self.values['P_curtail'])
+        s['yearly_exp_usage'] = scale * np.sum(self.values['P_exp'])
+        s['yearly_cmp_usage'] = scale * np.sum(self.values['P_cmp'])
+        s['yearly_electricity_revenue'] = dt * scale * np.sum((sell - buy) * price)
+        if self.simple_credit:
+            s['yearly_capacity_credit'] = p['CC_value'] * 365 * (p['CC_wind'] * p['X_wind'] + p['CC_exp'] * p['X_exp'])
+        else:
+            s['yearly_capacity_credit'] = p['CC_value'] * 365 * p['X_credit']
+        s['yearly_total_revenue'] = s['yearly_electricity_revenue'] + s['yearly_capacity_credit']
+        s['yearly_costs'] = sum((p['CRF_' + name] * p['C_' + name] + p['F_' + name]) * p['X_' + name]
+                                for name in ['wind', 'well', 'cmp', 'exp'])
+        s['yearly_costs'] += dt * scale * (p['V_wind'] * np.sum(self.values['P_wind']) +
+                                           p['V_cmp'] * np.sum(self.values['P_cmp']) +
+                                           p['V_exp'] * np.sum(self.values['P_exp']))
+        s['yearly_profit'] = s['yearly_total_revenue'] - s['yearly_costs']
+        s['yearly_electricity_value'] = dt * scale / p['price_grid_average'] * np.sum(sell * price)
+        return df, s
@@ -1,8 +1,14 @@
 from pyomo.environ import *
 
 
+# rules ending in _expr return the expression that defines a variable, used directly as an Expression in the compact
+# model (inputs['compact']) or set equal to the variable by the constraint rule of the same name
+def P_wind_expr(model, t):
+    return model.X_wind * model.P_wind_fr[t]
+
+
 def pwr_wind(model, t):
-    return model.P_wind[t] == model.X_wind * model.P_wind_fr[t]
+    return model.P_wind[t] == P_wind_expr(model, t)
 
 
 # ----------------
@@ -71,6 +77,34 @@ def energy_capacity_well_max(model, t):
     return model.E_well[t] <= model.E_well_max_fr * model.E_well_duration * model.X_well
 
 
+# ----------------
+# capacity bounds - fixed capacities (parameters) limit the variables directly, in place of the constraints above
+# ----------------
+def P_cmp_bounds(model, t):
+    return 0.0, model.P_cmp_max  # min(X_cmp, X_well)
+
+
+def P_exp_bounds(model, t):
+    return 0.0, model.P_exp_max  # min(X_exp, X_well)
+
+
+def P_grid_sell_bounds(model, t):
+    return 0.0, model.X_wind
+
+
+def P_grid_buy_bounds_enabled(model, t):
+    return 0.0, model.X_wind
+
+
+def P_grid_buy_bounds_disabled(model, t):
+    return 0.0, 0.0  # turned off arbitrage
+
+
+def E_well_bounds(model, t):
+    return model.E_well_min_fr * model.E_well_duration * model.X_well, \
+           model.E_well_max_fr * model.E_well_duration * model.X_well
+
+
 # ----------------
 # power balance
 # ----------------
@@ -79,11 +113,24 @@ def power_balance(model, t):
            model.P_cmp[t]
 
 
+# ----------------
+# time sums - built once as Expression components named total_<variable>[_<weight>] and shared by the rules below
+# ----------------
+def time_sum(name, weight=None):
+    # rule for the sum over time of variable name, weighted by the time series parameter weight if given
+    if weight is None:
+        return lambda model: quicksum(model.component(name)[t] for t in model.t)
+    return lambda model: sum_product(model.component(name), model.component(weight), index=model.t)
+
+
 # ----------------
 # energy stored
 # ----------------
 def energy_stored_init(model):
-    return model.E_well_init == value(model.X_well) * model.E_well_init_fr * model.E_well_duration
+    if model.X_well.is_variable_type():
+        # optimized well capacity, use its initial value to keep the constraint linear
+        return model.E_well_init == value(model.X_well) * model.E_well_init_fr * model.E_well_duration
+    return model.E_well_init == model.X_well * model.E_well_init_fr * model.E_well_duration
 
 
 def energy_stored(model, t):
@@ -102,10 +149,17 @@ def energy_stored_final(model):
 # ----------------
 # avoided emissions
 # ----------------
+def avoided_emissions_expr(model):
+    return model.delta_t * model.total_P_grid_sell_emissions_grid - \
+           model.delta_t * model.total_P_grid_buy_emissions_grid
+
+
 def emissions(model):
-    return model.avoided_emissions == model.delta_t * sum(
-        model.P_grid_sell[t] * model.emissions_grid[t] for t in model.t) - \
-           model.delta_t * sum(model.P_grid_buy[t] * model.emissions_grid[t] for t in model.t)
+    return model.avoided_emissions == avoided_emissions_expr(model)
+
+
+def avoided_emissions_min(model):
+    return model.avoided_emissions >= model.avoided_emissions_min
 
 
 # ----------------
@@ -115,61 +169,100 @@ def total_electricity(model):
     return model.total_electricity == sum(model.P_wind[t] for t in model.t)
 
 
+def yearly_electricity_expr(model):
+    return model.total_P_grid_sell * 8760 / (model.T * model.delta_t)
+
+
 def yearly_electricity(model):
-    return model.yearly_electricity == sum(model.P_grid_sell[t] for t in model.t) * 8760 / (model.T * model.delta_t)
+    return model.yearly_electricity == yearly_electricity_expr(model)
+
+
+def yearly_electricity_generated_expr(model):
+    return model.total_P_wind * 8760 / (model.T * model.delta_t)
 
 
 def yearly_electricity_generated(model):
-    return model.yearly_electricity_generated == sum(model.P_wind[t] for t in model.t) * 8760 / (
-                model.T * model.delta_t)
+    return model.yearly_electricity_generated == yearly_electricity_generated_expr(model)
+
+
+def yearly_electricity_purchased_expr(model):
+    return model.total_P_grid_buy * 8760 / (model.T * model.delta_t)
 
 
 def yearly_electricity_purchased(model):
-    return model.yearly_electricity_purchased == sum(model.P_grid_buy[t] for t in model.t) * 8760 / (
-            model.T * model.delta_t)
+    return model.yearly_electricity_purchased == yearly_electricity_purchased_expr(model)
+
+
+def yearly_curtailment_expr(model):
+    return model.total_P_curtail * 8760 / (model.T * model.delta_t)
 
 
 def yearly_curtailment(model):
-    return model.yearly_curtailment == sum(model.P_curtail[t] for t in model.t) * 8760 / (model.T * model.delta_t)
+    return model.yearly_curtailment == yearly_curtailment_expr(model)
+
+
+def yearly_exp_usage_expr(model):
+    return model.total_P_exp * 8760 / (model.T * model.delta_t)
 
 
 def yearly_exp_usage(model):
-    return model.yearly_exp_usage == sum(model.P_exp[t] for t in model.t) * 8760 / (model.T * model.delta_t)
+    return model.yearly_exp_usage == yearly_exp_usage_expr(model)
+
+
+def yearly_cmp_usage_expr(model):
+    return model.total_P_cmp * 8760 / (model.T * model.delta_t)
 
 
 def yearly_cmp_usage(model):
-    return model.yearly_cmp_usage == sum(model.P_cmp[t] for t in model.t) * 8760 / (model.T * model.delta_t)
+    return model.yearly_cmp_usage == yearly_cmp_usage_expr(model)
 
 
 # ----------------
 # economics
 # ----------------
+def electricity_revenue_expr(model, t):
+    return (model.P_grid_sell[t] - model.P_grid_buy[t]) * model.delta_t * model.price_grid[t]
+
+
 def electricity_revenue(model, t):
-    return model.electricity_revenue[t] == (model.P_grid_sell[t] - model.P_grid_buy[t]) * \
-           model.delta_t * model.price_grid[t]
+    return model.electricity_revenue[t] == electricity_revenue_expr(model, t)
+
+
+def yearly_electricity_revenue_expr(model):
+    return model.delta_t * (model.total_P_grid_sell_price_grid - model.total_P_grid_buy_price_grid) * 8760 / (
+            model.T * model.delta_t)
 
 
 def yearly_electricity_revenue(model):
-    return model.yearly_electricity_revenue == model.delta_t * sum(
-        (model.P_grid_sell[t] - model.P_grid_buy[t]) * model.price_grid[t] for t in model.t) * 8760 / (
-                   model.T * model.delta_t)
+    return model.yearly_electricity_revenue == yearly_electricity_revenue_expr(model)
+
+
+def yearly_capacity_credit_expr(model):
+    # X_credit = min(X_wind, X_wind * CC_wind + X_exp * CC_exp), calculated with the parameters
+    return model.CC_value * 365 * model.X_credit
 
 
 def yearly_capacity_credit(model):
-    return model.yearly_capacity_credit == model.CC_value * 365 * min(model.X_wind,
-                                                                      model.X_wind * model.CC_wind + model.X_exp * model.CC_exp)
+    return model.yearly_capacity_credit == yearly_capacity_credit_expr(model)
+
+
+def yearly_capacity_credit_simple_expr(model):
+    return model.CC_value * 365 * (model.X_wind * model.CC_wind + model.X_exp * model.CC_exp)
 
 
 def yearly_capacity_credit_simple(model):
-    return model.yearly_capacity_credit == model.CC_value * 365 * (
-                model.X_wind * model.CC_wind + model.X_exp * model.CC_exp)
+    return model.yearly_capacity_credit == yearly_capacity_credit_simple_expr(model)
+
+
+def yearly_total_revenue_expr(model):
+    return model.yearly_electricity_revenue + model.yearly_capacity_credit
 
 
 def yearly_total_revenue(model):
-    return model.yearly_total_revenue == model.yearly_electricity_revenue + model.yearly_capacity_credit
+    return model.yearly_total_revenue == yearly_total_revenue_expr(model)
 
 
-def yearly_costs(model):
+def yearly_costs_expr(model):
     # capital costs = capacity * annual costs
     capital = model.CRF_wind * model.X_wind * model.C_wind + \
               model.CRF_well * model.X_well * model.C_well + \
@@ -180,24 +273,35 @@ def yearly_costs(model):
     fixed = model.X_wind * model.F_wind + model.X_well * model.F_well + model.X_cmp * model.F_cmp + model.X_exp * model.F_exp
 
     # variable costs
-    variable = model.V_wind * model.delta_t * sum(model.P_wind[t] for t in model.t) + model.V_cmp * model.delta_t * sum(
-        model.P_cmp[t] for t in model.t) + model.V_exp * model.delta_t * sum(model.P_exp[t] for t in model.t)
+    variable = model.V_wind * model.delta_t * model.total_P_wind + model.V_cmp * model.delta_t * model.total_P_cmp + \
+               model.V_exp * model.delta_t * model.total_P_exp
     variable = variable * 8760 / (model.T * model.delta_t)  # scale to one year
 
-    return model.yearly_costs == capital + fixed + variable
+    return capital + fixed + variable
+
+
+def yearly_costs(model):
+    return model.yearly_costs == yearly_costs_expr(model)
+
+
+def yearly_profit_expr(model):
+    return model.yearly_total_revenue - model.yearly_costs
 
 
 def yearly_profit(model):
-    return model.yearly_profit == model.yearly_total_revenue - model.yearly_costs
+    return model.yearly_profit == yearly_profit_expr(model)
 
 
 # ----------------
 # value of electricity (denominator of COVE)
 # ----------------
+def yearly_electricity_value_expr(model):
+    return model.delta_t * model.total_P_grid_sell_price_grid / model.price_grid_average * 8760 / (
+            model.T * model.delta_t)
+
+
 def yearly_electricity_value(model):
-    return model.yearly_electricity_value == model.delta_t * sum(
-        model.P_grid_sell[t] * model.price_grid[t] for t in model.t) / model.price_grid_average * 8760 / (
-                   model.T * model.delta_t)
+    return model.yearly_electricity_value == yearly_electricity_value_expr(model)
 
 
 # ----------------
@@ -217,3 +321,7 @@ def objective_PROFIT(model):
 
 def objective_COST(model):
     return model.yearly_costs
+
+
+def objective_avoided_emissions(model):
+    return model.avoided_emissions
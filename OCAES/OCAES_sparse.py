@@ -0,0 +1,447 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import linprog
+from pyomo.environ import maximize
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+
+# time series variables, same names and order as the pyomo model
+series_variables = ['P_wind', 'P_cmp', 'P_exp', 'P_curtail', 'P_grid_sell', 'P_grid_buy', 'E_well',
+                    'electricity_revenue']
+
+# single value variables, same names and order as the pyomo model (optimized capacities are added in front)
+single_variables = ['E_well_init_fr', 'E_well_init', 'avoided_emissions',
+                    'yearly_electricity', 'yearly_electricity_generated', 'yearly_electricity_purchased',
+                    'yearly_curtailment', 'yearly_exp_usage', 'yearly_cmp_usage',
+                    'yearly_electricity_revenue', 'yearly_capacity_credit', 'yearly_total_revenue',
+                    'yearly_costs', 'yearly_profit', 'yearly_electricity_value']
+
+# storage variables, left out (zero) without storage capacity
+storage_variables = ['P_cmp', 'P_exp', 'E_well', 'E_well_init_fr', 'E_well_init']
+
+# time series parameters, same names and order as the pyomo model
+series_parameters = ['P_wind_fr', 'price_grid', 'emissions_grid']
+
+# version of the layout of the linear program (rows, columns and matrix entries), part of the key of the compiled
+# structures stored on disk (see OCAES_cache), increase it whenever the formulation changes
+model_version = 1
+
+# linprog status codes
+linprog_termination = {0: TerminationCondition.optimal,
+                       1: TerminationCondition.maxIterations,
+                       2: TerminationCondition.infeasible,
+                       3: TerminationCondition.unbounded,
+                       4: TerminationCondition.error}
+
+
+def compile_structure(rows, cols, n_rows):
+    # CSR structure of a matrix with entries at (rows, cols), duplicate entries are summed
+    # returns a dict of indptr, indices and the position of each entry in the CSR data
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    first = np.ones(len(order), dtype=bool)  # first entry of each (row, col)
+    first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    position = np.empty(len(order), dtype=np.int32)
+    position[order] = np.cumsum(first) - 1
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[first], minlength=n_rows))])
+    return {'indptr': indptr.astype(np.int32), 'indices': cols[first].astype(np.int32), 'position': position}
+
+
+class ocaes_lp:
+    """
+    OCAES linear program assembled directly as scipy.sparse arrays
+
+    Builds the same variables, constraints and objective as the pyomo model declared in ocaes, one vectorized block
+    per constraint family instead of one rule call per time step. Rows are stored as lower <= A x <= upper.
+
+    params         : dict of single value parameters, named as in the pyomo model
+    series         : dict of time series parameters (numpy arrays), named as in the pyomo model
+    capacity_vars  : capacities that are optimized (variables) rather than fixed (parameters)
+    arbitrage      : allow power to be purchased from the grid
+    simple_credit  : use the simple (linear) capacity credit
+    dispatch_const : hold the power delivered to the grid constant
+    objective      : name of the objective variable
+    sense          : pyomo objective sense, maximize or minimize
+    avoided_emissions_min : lower bound on the avoided emissions [ton], optional
+    storage        : False leaves out the storage variables and constraints (no storage capacity)
+    method         : linprog method, highs (automatic), highs-ds (dual simplex) or highs-ipm (interior point)
+    options        : dict of linprog options (e.g. tolerances), optional
+    structure      : compiled structure of the matrix (see compile_structure), e.g. from the on-disk cache, optional
+    weights        : weight of each time step in the yearly totals, e.g. the number of days a representative day
+                     stands for, optional (all 1.0)
+    day_sequence   : representative day of each day, for series of representative days (see OCAES_aggregation),
+                     the storage level is then tracked from day to day (E_well_day, the level at the start of each
+                     day) and E_well is the level within the representative day, relative to its start, the last
+                     day can be partial (params['T'] - 1 time steps in all), optional
+    E_well_init    : initial storage level, fixed (e.g. carried forward from the previous window of a rolling horizon),
+                     optional (optimized)
+    cyclic         : True returns the storage to its initial level at the last time step, False leaves the last level
+                     free or at E_well_final
+    E_well_final   : storage level at the last time step if not cyclic, optional (free)
+    """
+
+    def __init__(self, params, series, capacity_vars, arbitrage, simple_credit, dispatch_const, objective, sense,
+                 avoided_emissions_min=None, storage=True, method='highs', options=None, structure=None,
+                 weights=None, day_sequence=None, E_well_init=None, cyclic=True, E_well_final=None):
+        self.params = params
+        self.method = method
+        self.options = options
+        self.series = series
+        self.capacity_vars = list(capacity_vars)
+        self.simple_credit = simple_credit
+        self.objective = objective
+        self.sense = sense
+
+        N = len(series['P_wind_fr'])  # number of time steps
+        self.N = N
+        self.day_sequence = day_sequence
+        linked = storage and day_sequence is not None  # storage level linked across representative days
+        if day_sequence is not None:
+            n_days = max(day_sequence) + 1  # representative days
+            steps = N // n_days  # time steps per day
+            self.steps_per_day = steps
+            self.n_steps = params['T'] - 1  # time steps of all days, the last day can be partial
+
+        # ----------------
+        # Variables (columns)
+        # ----------------
+        self.zeros = [] if storage else storage_variables  # variables that are zero, left out of the columns
+        self.cols = {}
+        n = 0
+        for name in self.capacity_vars + single_variables:
+            if name in self.zeros:
+                continue
+            self.cols[name] = n
+            n += 1
+        for name in series_variables:
+            if name in self.zeros:
+                continue
+            self.cols[name] = np.arange(n, n + N)
+            n += N
+        if linked:
+            for name, size in [('E_well_day', len(day_sequence)), ('E_well_day_min', n_days),
+                               ('E_well_day_max', n_days)]:
+                self.cols[name] = np.arange(n, n + size)
+                n += size
+        self.n_cols = n
+
+        # bounds (NonNegativeReals unless noted)
+        self.col_lower = np.zeros(n)
+        self.col_upper = np.full(n, np.inf)
+        if storage:
+            self.col_upper[self.cols['E_well_init_fr']] = 1.0
+        for name in ['avoided_emissions', 'yearly_electricity', 'yearly_electricity_generated',
+                     'yearly_electricity_purchased', 'yearly_curtailment', 'yearly_exp_usage', 'yearly_cmp_usage',
+                     'yearly_electricity_revenue', 'yearly_capacity_credit', 'yearly_total_revenue', 'yearly_costs',
+                     'yearly_profit', 'yearly_electricity_value', 'electricity_revenue']:
+            self.col_lower[self.cols[name]] = -np.inf
+        if linked:
+            # levels within a representative day are relative to its start, their extremes include the start (0.0)
+            self.col_lower[self.cols['E_well']] = -np.inf
+            self.col_lower[self.cols['E_well_day_min']] = -np.inf
+            self.col_upper[self.cols['E_well_day_min']] = 0.0
+
+        # ----------------
+        # Constraints (rows)
+        # ----------------
+        self._rows, self._cols, self._vals = [], [], []
+        self._lower, self._upper = [], []
+        self.n_rows = 0
+
+        p = params
+        fr = series['P_wind_fr']
+        price = series['price_grid']
+        emissions = series['emissions_grid']
+        dt = p['delta_t']
+        scale = 8760 / (p['T'] * dt)  # scale to one year
+        eta = p['eta_storage_single']
+        ones = np.ones(N)
+        w = ones if weights is None else np.asarray(weights, dtype=float)  # weight of each time step
+
+        # wind power
+        self.add_rows([('P_wind', ones), ('X_wind', -fr)], 0.0, 0.0)
+
+        # capacity
+        if 'X_storage' in self.capacity_vars:
+            for name in ['X_well', 'X_cmp', 'X_exp']:
+                self.add_rows([(name, 1.0), ('X_storage', -1.0)], 0.0, 0.0, n=1)
+
+        # capacity - power, fixed capacities are column bounds rather than rows
+        fixed_storage = not any(name in self.capacity_vars for name in ['X_well', 'X_cmp', 'X_exp'])
+        fixed_wind = 'X_wind' not in self.capacity_vars
+        if not fixed_storage:
+            self.add_rows([('P_cmp', ones), ('X_cmp', -ones)], -np.inf, 0.0)
+            self.add_rows([('P_exp', ones), ('X_exp', -ones)], -np.inf, 0.0)
+            self.add_rows([('P_cmp', ones), ('X_well', -ones)], -np.inf, 0.0)
+            self.add_rows([('P_exp', ones), ('X_well', -ones)], -np.inf, 0.0)
+        elif storage:
+            self.col_upper[self.cols['P_cmp']] = p['P_cmp_max']
+            self.col_upper[self.cols['P_exp']] = p['P_exp_max']
+        if fixed_wind:
+            self.col_upper[self.cols['P_grid_sell']] = p['X_wind']
+        else:
+            self.add_rows([('P_grid_sell', ones), ('X_wind', -ones)], -np.inf, 0.0)
+        self.add_rows([('P_grid_sell', ones), ('P_grid_buy', ones), ('X_wind', -ones)], -np.inf, 0.0)
+        if not arbitrage:
+            self.col_upper[self.cols['P_grid_buy']] = 0.0
+        elif fixed_wind:
+            self.col_upper[self.cols['P_grid_buy']] = p['X_wind']
+        else:
+            self.add_rows([('P_grid_buy', ones), ('X_wind', -ones)], -np.inf, 0.0)
+
+        # capacity - energy
+        E_min = p['E_well_min_fr'] * p['E_well_duration']
+        E_max = p['E_well_max_fr'] * p['E_well_duration']
+        if linked:
+            # start of each day plus the lowest and highest level within its representative day
+            day = np.arange(N) // steps  # representative day of each time step
+            self.add_rows([('E_well', ones), (self.cols['E_well_day_min'][day], -ones)], 0.0, np.inf)
+            self.add_rows([('E_well', -ones), (self.cols['E_well_day_max'][day], ones)], 0.0, np.inf)
+            ones_days = np.ones(len(day_sequence))
+            self.add_rows([('E_well_day', ones_days), (self.cols['E_well_day_min'][day_sequence], ones_days),
+                           ('X_well', -E_min * ones_days)], 0.0, np.inf, n=len(day_sequence))
+            self.add_rows([('E_well_day', ones_days), (self.cols['E_well_day_max'][day_sequence], ones_days),
+                           ('X_well', -E_max * ones_days)], -np.inf, 0.0, n=len(day_sequence))
+        elif not fixed_storage:
+            self.add_rows([('E_well', -ones), ('X_well', E_min * ones)], -np.inf, 0.0)
+            self.add_rows([('E_well', ones), ('X_well', -E_max * ones)], -np.inf, 0.0)
+        elif storage:
+            self.col_lower[self.cols['E_well']] = E_min * p['X_well']
+            self.col_upper[self.cols['E_well']] = E_max * p['X_well']
+
+        # power balance
+        self.add_rows([('P_wind', ones), ('P_exp', ones), ('P_grid_buy', ones),
+                       ('P_curtail', -ones), ('P_grid_sell', -ones), ('P_cmp', -ones)], 0.0, 0.0)
+
+        # energy stored (initial storage uses the initial well capacity, as in the pyomo rule)
+        if linked:
+            # within each representative day from 0.0 at its start, from day to day by the change over the
+            # representative day, back to the initial level after the last day
+            self.add_rows([('E_well_init', 1.0), ('E_well_init_fr', -p['X_well'] * p['E_well_duration'])],
+                          0.0, 0.0, n=1)
+            self.add_rows([(self.cols['E_well_day'][:1], 1.0), ('E_well_init', -1.0)], 0.0, 0.0, n=1)
+            t = np.arange(N)
+            self.add_rows([('E_well', ones), (self.cols['E_well'][np.maximum(t - 1, 0)],
+                            -(t % steps > 0).astype(float)),
+                           ('P_cmp', -dt * eta * ones), ('P_exp', dt / eta * ones)], 0.0, 0.0)
+            d = np.arange(len(day_sequence))
+            last = np.minimum(steps, self.n_steps - d * steps) - 1  # last time step of each day
+            self.add_rows([(self.cols['E_well_day'][(d + 1) % len(d)], 1.0), (self.cols['E_well_day'][d], -1.0),
+                           (self.cols['E_well'][day_sequence * steps + last], -1.0)], 0.0, 0.0, n=len(d))
+        elif storage:
+            self.add_rows([('E_well_init', 1.0), ('E_well_init_fr', -p['X_well'] * p['E_well_duration'])],
+                          0.0, 0.0, n=1)
+            self.add_rows([(self.cols['E_well'][:1], 1.0), ('E_well_init', -1.0)], 0.0, 0.0, n=1)
+            self.add_rows([(self.cols['E_well'][1:], ones[1:]), (self.cols['E_well'][:-1], -ones[1:]),
+                           (self.cols['P_cmp'][1:], -dt * eta * ones[1:]),
+                           (self.cols['P_exp'][1:], dt / eta * ones[1:])], 0.0, 0.0, n=N - 1)
+            if cyclic:
+                self.add_rows([(self.cols['E_well'][-1:], 1.0), ('E_well_init', -1.0)], 0.0, 0.0, n=1)
+            elif E_well_final is not None:
+                self.add_rows([(self.cols['E_well'][-1:], 1.0)], E_well_final, E_well_final, n=1)
+            if E_well_init is not None:
+                self.col_lower[self.cols['E_well_init']] = self.col_upper[self.cols['E_well_init']] = E_well_init
+
+        # emissions
+        self.add_sum([('avoided_emissions', 1.0), ('P_grid_sell', -dt * w * emissions),
+                      ('P_grid_buy', dt * w * emissions)])
+        if avoided_emissions_min is not None:
+            self.add_rows([('avoided_emissions', 1.0)], avoided_emissions_min, np.inf, n=1)
+
+        # electricity
+        self.add_sum([('yearly_electricity', 1.0), ('P_grid_sell', -scale * w)])
+        self.add_sum([('yearly_electricity_generated', 1.0), ('P_wind', -scale * w)])
+        self.add_sum([('yearly_electricity_purchased', 1.0), ('P_grid_buy', -scale * w)])
+        self.add_sum([('yearly_curtailment', 1.0), ('P_curtail', -scale * w)])
+        self.add_sum([('yearly_exp_usage', 1.0), ('P_exp', -scale * w)])
+        self.add_sum([('yearly_cmp_usage', 1.0), ('P_cmp', -scale * w)])
+
+        # economics
+        self.add_rows([('electricity_revenue', ones), ('P_grid_sell', -dt * price), ('P_grid_buy', dt * price)],
+                      0.0, 0.0)
+        self.add_sum([('yearly_electricity_revenue', 1.0), ('P_grid_sell', -dt * scale * w * price),
+                      ('P_grid_buy', dt * scale * w * price)])
+        if simple_credit:
+            self.add_sum([('yearly_capacity_credit', 1.0),
+                          ('X_wind', -p['CC_value'] * 365 * p['CC_wind']),
+                          ('X_exp', -p['CC_value'] * 365 * p['CC_exp'])])
+        else:
+            self.add_sum([('yearly_capacity_credit', 1.0)], p['CC_value'] * 365 * p['X_credit'])
+        self.add_sum([('yearly_total_revenue', 1.0), ('yearly_electricity_revenue', -1.0),
+                      ('yearly_capacity_credit', -1.0)])
+        self.add_sum([('yearly_costs', 1.0),
+                      ('X_wind', -(p['CRF_wind'] * p['C_wind'] + p['F_wind'])),
+                      ('X_well', -(p['CRF_well'] * p['C_well'] + p['F_well'])),
+                      ('X_cmp', -(p['CRF_cmp'] * p['C_cmp'] + p['F_cmp'])),
+                      ('X_exp', -(p['CRF_exp'] * p['C_exp'] + p['F_exp'])),
+                      ('P_wind', -p['V_wind'] * dt * scale * w),
+                      ('P_cmp', -p['V_cmp'] * dt * scale * w),
+                      ('P_exp', -p['V_exp'] * dt * scale * w)])
+        self.add_sum([('yearly_profit', 1.0), ('yearly_total_revenue', -1.0), ('yearly_costs', 1.0)])
+
+        # COVE
+        self.add_sum([('yearly_electricity_value', 1.0),
+                      ('P_grid_sell', -dt * scale / p['price_grid_average'] * w * price)])
+
+        # constant dispatch
+        if dispatch_const:
+            self.add_rows([('P_grid_sell', ones), ('X_dispatch', -ones)], 0.0, 0.0)
+
+        # assemble, the entries are summed into the compiled structure, compiled here unless given
+        vals = np.concatenate(self._vals)
+        if structure is None or len(structure['position']) != len(vals) or len(structure['indptr']) != self.n_rows + 1:
+            structure = compile_structure(np.concatenate(self._rows), np.concatenate(self._cols), self.n_rows)
+        self.structure = structure
+        data = np.bincount(structure['position'], weights=vals, minlength=len(structure['indices']))
+        self.A = sp.csr_matrix((data, structure['indices'], structure['indptr']), shape=(self.n_rows, self.n_cols))
+        self.row_lower = np.concatenate(self._lower)
+        self.row_upper = np.concatenate(self._upper)
+        del self._rows, self._cols, self._vals, self._lower, self._upper
+
+        # ----------------
+        # Objective
+        # ----------------
+        self.c = np.zeros(self.n_cols)
+        self.c[self.cols[objective]] = 1.0
+
+    def add_rows(self, terms, lower, upper, n=None):
+        # add n rows, row k: sum(coef[k] * x[col[k]]) within [lower, upper]
+        # terms are (variable or parameter name or column indices, coefficients); parameters move to the bounds
+        if n is None:
+            n = self.N
+        rhs = np.zeros(n)
+        for name, coefs in terms:
+            coefs = np.broadcast_to(np.asarray(coefs, dtype=float), (n,))
+            if isinstance(name, str) and name in self.zeros:
+                continue
+            if isinstance(name, str) and name not in self.cols:  # fixed parameter
+                rhs -= coefs * self.params[name]
+                continue
+            cols = self.cols[name] if isinstance(name, str) else name
+            self._rows.append(np.arange(self.n_rows, self.n_rows + n))
+            self._cols.append(np.broadcast_to(cols, (n,)))
+            self._vals.append(coefs)
+        self._lower.append(lower + rhs)
+        self._upper.append(upper + rhs)
+        self.n_rows += n
+
+    def add_sum(self, terms, rhs=0.0):
+        # add a single equality row, sum(coef * x[col]) == rhs, with terms as in add_rows
+        for name, coefs in terms:
+            coefs = np.atleast_1d(np.asarray(coefs, dtype=float))
+            if name in self.zeros:
+                continue
+            if name not in self.cols:  # fixed parameter
+                rhs -= coefs.sum() * self.params[name]
+                continue
+            cols = np.atleast_1d(self.cols[name])
+            self._rows.append(np.full(len(cols), self.n_rows))
+            self._cols.append(cols)
+            self._vals.append(np.broadcast_to(coefs, cols.shape))
+        self._lower.append(np.array([rhs]))
+        self._upper.append(np.array([rhs]))
+        self.n_rows += 1
+
+    def solve(self):
+        # solve with the HiGHS solver bundled in scipy, returns pyomo style results
+        eq = self.row_lower == self.row_upper
+        upper = ~eq & np.isfinite(self.row_upper)
+        lower = ~eq & np.isfinite(self.row_lower)  # lower <= A x as -A x <= -lower
+        A_eq, A_ub = self.A[eq], sp.vstack([self.A[upper], -self.A[lower]], format='csr')
+        b_ub = np.concatenate([self.row_upper[upper], -self.row_lower[lower]])
+        sign = -1.0 if self.sense == maximize else 1.0
+        res = linprog(sign * self.c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=self.row_lower[eq],
+                      bounds=np.column_stack([self.col_lower, self.col_upper]), method=self.method,
+                      options=self.options)
+        self.solution = res
+        self.b_ub, self.b_eq = b_ub, self.row_lower[eq]
+        return self.get_results('scipy-highs')
+
+    def solve_template(self, template, solver, options=None):
+        # solve with a file based solver (glpk or cbc) through an MPS template (see OCAES_template.lp_template), only
+        # the entries that changed since the last solve of the template are written, returns pyomo style results
+        template.update(self)
+        self.solution = template.solve(self, solver, options)
+        return self.get_results(solver)
+
+    def get_results(self, name):
+        # pyomo style results of the last solve
+        res = self.solution
+        results = SolverResults()
+        results.solver.name = name
+        results.solver.termination_condition = linprog_termination.get(res.status, TerminationCondition.error)
+        results.solver.status = SolverStatus.ok if res.status == 0 else SolverStatus.warning
+        results.solver.message = res.message
+        return results
+
+    def duality_gap(self):
+        # relative gap between the primal and dual objective of the last solve, nan if it was not solved to optimality
+        # dual objective from the marginals, infinite bounds have zero marginals and are left out
+        # nan for file based solvers (see solve_template), their solutions are read without the marginals
+        res = self.solution
+        if res.status != 0 or 'ineqlin' not in res:
+            return np.nan
+        dual = np.dot(self.b_ub, res.ineqlin.marginals) + np.dot(self.b_eq, res.eqlin.marginals)
+        for bound, marginals in [(self.col_lower, res.lower.marginals), (self.col_upper, res.upper.marginals)]:
+            dual += np.dot(np.where(marginals != 0.0, bound, 0.0), marginals)
+        return abs(res.fun - dual) / max(1.0, abs(res.fun))
+
+    def coefficient_ranges(self):
+        # smallest and largest absolute nonzero value of the constraint matrix, right hand sides and variable bounds,
+        # a measure of the conditioning of the linear program, returns a dict of (min, max) by name
+        ranges = {}
+        for name, values in [('matrix', self.A.data), ('rhs', np.concatenate([self.row_lower, self.row_upper])),
+                             ('bounds', np.concatenate([self.col_lower, self.col_upper]))]:
+            values = np.abs(values[np.isfinite(values) & (values != 0.0)])
+            ranges[name] = (values.min(), values.max()) if len(values) > 0 else (np.nan, np.nan)
+        return ranges
+
+    def solution_values(self):
+        # values of the columns of the last solve, nan if it was not solved to optimality (linprog returns no x for an
+        # infeasible or unbounded problem)
+        res = self.solution
+        if res.status != 0 or res.x is None:
+            return np.full(self.n_cols, np.nan)
+        return res.x
+
+    def value(self, name):
+        # solution value of a variable or parameter
+        if name in self.zeros:
+            return np.zeros(self.N) if name in series_variables else 0.0
+        if name in self.cols:
+            return self.solution_values()[self.cols[name]]
+        elif name in self.series:
+            return self.series[name]
+        return self.params[name]
+
+    def get_full_results(self):
+        # results in the same layout as ocaes.get_full_results() for the pyomo model
+        # representative days (see day_sequence) are expanded to every day of the time series
+        # variables are nan if the last solve was not optimal (see solution_values)
+        x = self.solution_values()
+        t = np.arange(self.N)  # time step of the model for each time step of the results
+        if self.day_sequence is not None:
+            t = (np.asarray(self.day_sequence)[:, None] * self.steps_per_day +
+                 np.arange(self.steps_per_day)).ravel()[:self.n_steps]
+        index = range(1, len(t) + 1)
+
+        s = pd.Series(dtype='float64')
+        for name in self.capacity_vars + single_variables:
+            s[name] = x[self.cols[name]] if name in self.cols else 0.0
+        skip = []  # parameters the pyomo model does not declare
+        if self.simple_credit:
+            skip += ['X_credit']
+        if 'X_well' in self.capacity_vars:
+            skip += ['P_cmp_max', 'P_exp_max']
+        for name, value in self.params.items():
+            if name not in self.cols and name not in skip:
+                s[name] = value
+
+        df = pd.DataFrame(index=index)
+        for name in series_variables:
+            df[name] = x[self.cols[name]][t] if name in self.cols else 0.0
+        for name in series_parameters:
+            df[name] = self.series[name][t]
+        if 'E_well_day' in self.cols:  # level at the start of the day plus the level within the representative day
+            df['E_well'] += np.repeat(x[self.cols['E_well_day']], self.steps_per_day)[:len(t)]
+        return df, s
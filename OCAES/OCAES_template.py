@@ -0,0 +1,245 @@
+import os
+import atexit
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+from scipy.optimize import OptimizeResult
+from pyomo.environ import maximize
+from OCAES.OCAES_cache import series_hash
+
+# file based solvers that read the MPS template, and their commands, in order of preference
+template_solvers = {'glpk': 'glpsol', 'cbc': 'cbc'}
+
+# templates by time series and name (see get_template), kept for the life of the process
+templates = {}
+
+# every number in the file has the same width, so that it can be overwritten in place
+number_format = '%24.16e'
+number_width = 24
+
+# status codes (as linprog) of the solution files, glpk basic (bas) and interior point (ipt) solutions, cbc
+glpk_status = {('f', 'f'): 0, ('n', 'f'): 2, ('n', 'n'): 2, ('i', 'n'): 2, ('f', 'n'): 3, 'o': 0, 'n': 2}
+cbc_status = {'optimal': 0, 'infeasible': 2, 'unbounded': 3}
+
+
+def get_template(series, name, directory=None):
+    # template of the time series and name (e.g. the objective), files are written to directory (named after the
+    # process, parallel sweeps each patch their own) or to a temporary directory of the template, removed with it
+    key = (series_hash(series), name)
+    if key not in templates:
+        filename = None
+        if directory is not None:
+            filename = os.path.join(directory, 'ocaes_' + key[0][:12] + '_' + name + '_' + str(os.getpid()) + '.mps')
+        templates[key] = lp_template(filename)
+    return templates[key]
+
+
+def close_templates():
+    # remove the files of all templates of the process, e.g. at the end of a sweep
+    for template in templates.values():
+        template.close()
+    templates.clear()
+
+
+# the templates are closed before the interpreter shuts down (their modules may be gone when they are deleted)
+atexit.register(close_templates)
+
+
+def get_template_solver(name=None):
+    # name (glpk or cbc) if given, otherwise the first installed template solver, None for HiGHS or if neither is
+    # installed (the sparse model is then solved in memory, a file round trip would only add time)
+    if name is not None and 'highs' in name:
+        return None
+    if name is not None and name not in template_solvers:
+        raise ValueError('solver_io template supports ' + ' and '.join(template_solvers) + ', not ' + str(name))
+    for solver in [name] if name is not None else template_solvers:
+        if shutil.which(template_solvers[solver]) is not None:
+            return solver
+    if name is not None:
+        raise RuntimeError('could not find ' + template_solvers[name] + ' for solver_io template')
+    return None
+
+
+class lp_template:
+    """
+    MPS file (free format) of an ocaes_lp, written once and patched in place for later cases
+
+    Rows and columns keep the order of the linear program (rows r0, r1, ..., columns x0, x1, ...) and every number is
+    written at the same width. A case with the same structure (sparsity of the matrix and objective, row types and
+    finite bounds) only overwrites the matrix, objective, right hand side and bound entries that changed, otherwise the
+    file is written again. Maximization objectives are negated, the file is always minimized.
+
+    filename : MPS file, the solution is written next to it (.sol), optional (in a temporary directory of the
+               template), the files are removed by close() or when the template is deleted
+    """
+
+    def __init__(self, filename=None):
+        self.directory = None
+        if filename is None:
+            self.directory = tempfile.TemporaryDirectory(prefix='ocaes_')
+            filename = os.path.join(self.directory.name, 'ocaes.mps')
+        self.filename = filename
+        self.structure = None  # structure of the written file, by name
+        self.values = None  # values in the written file, by section
+        self.offsets = None  # position of each value in the file [bytes], by section
+        self.patched = 0  # values written by the last update, all of them if the file was written again
+
+    def close(self):
+        # remove the files of the template, a template in its own temporary directory can not be used after
+        for filename in [self.filename, os.path.splitext(self.filename)[0] + '.sol']:
+            if os.path.exists(filename):
+                os.remove(filename)
+        if self.directory is not None:
+            self.directory.cleanup()
+        self.structure = None
+
+    def __del__(self):
+        self.close()
+
+    def sections(self, lp):
+        # structure and values of the file for the linear program lp
+        A = lp.A.tocsc()
+        c = (-1.0 if lp.sense == maximize else 1.0) * lp.c
+        lower, upper = np.isfinite(lp.row_lower), np.isfinite(lp.row_upper)
+        ranged = lower & upper & (lp.row_lower != lp.row_upper)  # G rows with a range
+        structure = {'shape': np.array(A.shape), 'indptr': A.indptr, 'indices': A.indices,
+                     'objective': np.flatnonzero(c),
+                     'rows': np.where(lower, np.where(ranged | ~upper, 'G', 'E'), 'L').astype(object),
+                     'ranged': ranged, 'lower': np.isfinite(lp.col_lower), 'upper': np.isfinite(lp.col_upper)}
+        values = {'matrix': A.data.copy(), 'objective': c[structure['objective']],
+                  'rhs': np.where(lower, lp.row_lower, lp.row_upper),
+                  'range': (lp.row_upper - lp.row_lower)[ranged],
+                  'lower': lp.col_lower[structure['lower']], 'upper': lp.col_upper[structure['upper']]}
+        return structure, values
+
+    def update(self, lp):
+        # bring the file up to date with the linear program lp, returns the number of values written
+        structure, values = self.sections(lp)
+        if self.structure is not None and all(np.array_equal(structure[name], self.structure[name])
+                                              for name in structure):
+            self.patched = self.patch(values)
+        else:
+            self.write(structure, values)
+            self.patched = sum(len(v) for v in values.values())
+        return self.patched
+
+    def write(self, structure, values):
+        # write the whole file, recording where each value is
+        n_rows, n_cols = structure['shape']
+        rows = np.array(['r' + str(i) for i in range(n_rows)], dtype=object)
+        cols = np.array(['x' + str(j) for j in range(n_cols)], dtype=object)
+
+        # COLUMNS, the objective entry of each column before its matrix entries
+        col = np.concatenate([structure['objective'], np.repeat(np.arange(n_cols), np.diff(structure['indptr']))])
+        row = np.concatenate([np.full(len(structure['objective']), 'obj', dtype=object),
+                              rows[structure['indices']]])
+        order = np.argsort(col, kind='stable')
+        columns = ' ' + cols[col[order]] + ' ' + row[order] + ' '
+        n_objective = len(structure['objective'])
+        position = np.empty(len(order), dtype=int)
+        position[order] = np.arange(len(order))  # line of each entry, objective entries first
+
+        # free format (FREE, cbc reads fixed format otherwise)
+        header = 'NAME OCAES FREE\nROWS\n N obj\n' + ''.join(' ' + structure['rows'] + ' ' + rows + '\n') + 'COLUMNS\n'
+        sections = [(columns, np.concatenate([values['objective'], values['matrix']])[order]),
+                    ('RHS\n', None),
+                    (' RHS ' + rows + ' ', values['rhs']),
+                    ('RANGES\n' if structure['ranged'].any() else '', None),
+                    (' RNG ' + rows[structure['ranged']] + ' ', values['range']),
+                    ('BOUNDS\n', None),
+                    (' LO BND ' + cols[structure['lower']] + ' ', values['lower']),
+                    (' UP BND ' + cols[structure['upper']] + ' ', values['upper']),
+                    (''.join(' MI BND ' + cols[~structure['lower']] + '\n') +
+                     ''.join(' PL BND ' + cols[~structure['upper']] + '\n') + 'ENDATA\n', None)]
+
+        # lines of prefix and value, the value of each line starts len(prefix) after the line
+        text, offsets, start = [header], [], len(header)
+        for prefix, numbers in sections:
+            if numbers is None:
+                text.append(prefix)
+                start += len(prefix)
+                continue
+            lengths = np.array([len(p) for p in prefix], dtype=int)
+            ends = start + np.cumsum(lengths + number_width + 1)
+            offsets.append(ends - number_width - 1)
+            text.append(''.join(p + number_format % v + '\n' for p, v in zip(prefix, numbers)))
+            start = int(ends[-1]) if len(ends) > 0 else start
+        with open(self.filename, 'w', newline='\n') as f:
+            f.write(''.join(text))
+
+        columns_offsets = offsets[0][position]
+        self.offsets = {'objective': columns_offsets[:n_objective], 'matrix': columns_offsets[n_objective:],
+                        'rhs': offsets[1], 'range': offsets[2], 'lower': offsets[3], 'upper': offsets[4]}
+        self.structure, self.values = structure, values
+
+    def patch(self, values):
+        # overwrite the values that changed, all at once through a memory map, returns the number of values written
+        offsets, numbers = [], []
+        for section, new in values.items():
+            changed = np.flatnonzero(new != self.values[section])
+            offsets.append(self.offsets[section][changed])
+            numbers.append(new[changed])
+        offsets, numbers = np.concatenate(offsets), np.concatenate(numbers)
+        if len(offsets) > 0:
+            text = ''.join(number_format % v for v in numbers).encode()
+            f = np.memmap(self.filename, dtype=np.uint8, mode='r+')
+            f[(offsets[:, None] + np.arange(number_width)).ravel()] = np.frombuffer(text, dtype=np.uint8)
+            f.flush()
+            del f
+        self.values = values
+        return len(offsets)
+
+    def solve(self, lp, solver, options=None):
+        # run solver (glpk or cbc) on the file, returns the solution of lp in the layout of scipy's linprog
+        # options are command line options of the solver, name: value ('' for flags)
+        solution = os.path.splitext(self.filename)[0] + '.sol'
+        if os.path.exists(solution):
+            os.remove(solution)
+        flag = '--' if solver == 'glpk' else '-'
+        arguments = []
+        for name, value in (options or {}).items():
+            arguments += [flag + name] + ([str(value)] if value != '' else [])
+        if solver == 'glpk':
+            command = ['glpsol', '--freemps', self.filename] + arguments + ['--write', solution]
+        else:
+            command = ['cbc', self.filename] + arguments + ['-solve', '-printingOptions', 'all', '-solution', solution]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0 or not os.path.exists(solution):
+            raise RuntimeError(' '.join(command) + ' failed\n' + process.stdout + process.stderr)
+
+        x = np.zeros(lp.n_cols)
+        with open(solution) as f:
+            if solver == 'glpk':
+                status, fun = read_glpk_solution(f, x)
+            else:
+                status, fun = read_cbc_solution(f, x)
+        return OptimizeResult(x=x, fun=fun, status=status, nit=np.nan, success=status == 0,
+                              message=solver + ' status ' + str(status))
+
+
+def read_glpk_solution(f, x):
+    # glpk plain text solution (glpsol --write), column values into x, returns the status and objective
+    status, fun = 4, np.nan
+    for line in f:
+        tokens = line.split()
+        if len(tokens) == 0:
+            continue
+        if tokens[0] == 's' and tokens[1] == 'bas':  # s bas rows cols primal_status dual_status objective
+            status, fun = glpk_status.get((tokens[4], tokens[5]), 4), float(tokens[6])
+        elif tokens[0] == 's':  # s ipt rows cols status objective
+            status, fun = glpk_status.get(tokens[4], 4), float(tokens[5])
+        elif tokens[0] == 'j':  # j col [basis_status] value dual
+            x[int(tokens[1]) - 1] = float(tokens[-2])
+    return status, fun
+
+
+def read_cbc_solution(f, x):
+    # cbc solution (cbc -printingOptions all -solution), column values into x, returns the status and objective
+    tokens = f.readline().split()
+    status, fun = cbc_status.get(tokens[0].lower(), 4), float(tokens[-1])
+    for line in f:
+        tokens = line.replace('**', '').split()  # ** marks infeasibilities
+        if tokens[1].startswith('x'):  # index name value reduced_cost, rows (r) come first
+            x[int(tokens[1][1:])] = float(tokens[2])
+    return status, fun
@@ -0,0 +1,128 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from OCAES.OCAES import ocaes, objectives, solvers, persistent_solvers, solver_profiles, solver_available
+
+
+# =============================================================================#
+# Solver tuning - benchmark the available solvers and profiles, recommend the fastest per objective and horizon
+# =============================================================================#
+# horizon buckets, maximum number of time steps in each (longer time series are 'multi_year')
+horizons = {'week': 168, 'month': 744, 'year': 8784}
+
+
+# profiles that keep to one thread (see solver_profiles), the only ones recommended for cases solved in parallel, the
+# all-core profiles (single and barrier) oversubscribe the cores when every worker of a sweep uses them
+parallel_profiles = ['sweep']
+
+
+def horizon_bucket(n_steps):
+    for name, max_steps in horizons.items():
+        if n_steps <= max_steps:
+            return name
+    return 'multi_year'
+
+
+def solver_candidates():
+    # (backend, solver) pairs to benchmark, the available solvers and their in-memory counterparts,
+    # and the sparse backend (scipy's HiGHS, no solver)
+    candidates = []
+    for name in solvers + list(persistent_solvers.values()):
+        if ('pyomo', name) not in candidates and solver_available(name):
+            candidates.append(('pyomo', name))
+    candidates.append(('sparse', None))
+    return candidates
+
+
+def benchmark_solvers(data, objective_names, steps, inputs=None, rtol=1e-6):
+    # solve one case per objective and horizon (first steps of data) with each solver candidate and profile
+    # returns one row per run: time [s] to build and solve, objective value and whether it agrees with the other runs
+    # runs are timed one at a time, recommend_solvers keeps parallel sweeps to parallel_profiles
+    rows = []
+    for objective in objective_names:
+        for n_steps in steps:
+            case = []
+            for backend, solver in solver_candidates():
+                for profile in solver_profiles:
+                    if inputs is None:
+                        case_inputs = ocaes.get_default_inputs()
+                    else:
+                        case_inputs = inputs.copy()
+                    case_inputs['objective'] = objective
+                    case_inputs['backend'] = backend
+                    case_inputs['solver_profile'] = profile
+
+                    s = pd.Series({'objective': objective, 'horizon': horizon_bucket(n_steps), 'steps': n_steps,
+                                   'backend': backend, 'solver': solver, 'solver_profile': profile,
+                                   'objective_value': np.nan})  # nan unless solved
+                    start = time.time()
+                    try:
+                        model = ocaes(data.iloc[:n_steps].reset_index(drop=True), case_inputs, solver=solver)
+                        s['time'] = time.time() - start
+                        s['solver_time'] = model.solver_time
+                        s['termination'] = str(model.results.solver.termination_condition)
+                        s['objective_value'] = model.get_full_results()[1][objectives[objective][1]]
+                    except Exception as error:  # solver or option not supported, the run is not recommended
+                        s['time'] = time.time() - start
+                        s['termination'] = 'error: ' + str(error)
+                    case.append(s)
+
+            # objective values should agree with the median of the optimal runs
+            case = pd.DataFrame(case)
+            optimal = case.termination == 'optimal'
+            reference = case.loc[optimal, 'objective_value'].median()
+            case['agrees'] = optimal & ((case.objective_value - reference).abs() <= rtol * max(1.0, abs(reference)))
+            rows.append(case)
+    return pd.concat(rows, ignore_index=True)
+
+
+def recommend_solvers(benchmark, parallel=True):
+    # fastest run that agrees with the others, per objective and horizon
+    # parallel=True (cases solved in parallel, e.g. by a sweep) only recommends the single thread parallel_profiles
+    agrees = benchmark[benchmark.agrees.astype(bool)]
+    if parallel:
+        agrees = agrees[agrees.solver_profile.isin(parallel_profiles)]
+    fastest = agrees.loc[agrees.groupby(['objective', 'horizon']).time.idxmin()]
+    return fastest[['objective', 'horizon', 'backend', 'solver', 'solver_profile', 'time']].reset_index(drop=True)
+
+
+def recommended_solver(filename, objective, n_steps):
+    # recommended backend, solver and solver_profile (see recommend_solvers) for a case,
+    # None if filename does not exist or has no recommendation for the objective and horizon
+    if not os.path.exists(filename):
+        return None
+    recommendations = pd.read_csv(filename)
+    match = recommendations[(recommendations.objective == objective) &
+                            (recommendations.horizon == horizon_bucket(n_steps))]
+    if len(match) == 0:
+        return None
+    recommendation = match.iloc[0].copy()
+    if pd.isna(recommendation['solver']):
+        recommendation['solver'] = None  # sparse backend
+    return recommendation
+
+
+# =============================================================================#
+# command line, e.g. python -m OCAES.solver_tuning timeseries.csv --objectives COVE REVENUE --steps 72 8760
+# =============================================================================#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark solvers and profiles, recommend the fastest per '
+                                                 'objective and horizon')
+    parser.add_argument('timeseries_filename', help='csv file with the model time series')
+    parser.add_argument('--objectives', nargs='+', default=list(objectives), help='objectives to benchmark')
+    parser.add_argument('--steps', nargs='+', type=int, default=[72, 8760],
+                        help='time steps (horizons) to benchmark, the first steps of the time series')
+    parser.add_argument('--benchmark_filename', default='solver_benchmark.csv', help='all runs')
+    parser.add_argument('--tuning_filename', default='solver_tuning.csv', help='recommended solvers')
+    parser.add_argument('--one_at_a_time', action='store_true',
+                        help='recommend all-core profiles too, for cases that are not solved in parallel')
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.timeseries_filename)
+    benchmark = benchmark_solvers(data, args.objectives, args.steps)
+    benchmark.to_csv(args.benchmark_filename, index=False)
+    recommendations = recommend_solvers(benchmark, parallel=not args.one_at_a_time)
+    recommendations.to_csv(args.tuning_filename, index=False)
+    print(recommendations)
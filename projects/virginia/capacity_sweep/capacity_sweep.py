@@ -1,4 +1,7 @@
 from OCAES import ocaes, monteCarloInputs
+from OCAES.OCAES import mutable_inputs, capacity_vars
+from OCAES.OCAES_precheck import InfeasibleDispatchError
+from OCAES.solver_tuning import recommended_solver, parallel_profiles
 import pandas as pd
 import numpy as np
 from joblib import Parallel, delayed, parallel_backend
@@ -10,17 +13,17 @@ import matplotlib.pyplot as plt
 
 
 # =====================
-# function to enable parameter sweep
+# functions to enable parameter sweep
 # =====================
-def parameter_sweep(sweep_input):
-    # Record time to solve
-    t0 = time.time()
-
-    # create model
-    data = pd.read_csv(sweep_input['timeseries_filename'])
+def get_model_inputs(sweep_input):
     model_inputs = ocaes.get_default_inputs()
 
     model_inputs['objective'] = sweep_input['objective']
+    model_inputs['model_type'] = 'concrete'  # build the pyomo model once
+    model_inputs['solver_profile'] = sweep_input['solver_profile']
+    model_inputs['screening'] = sweep_input['screening']
+    model_inputs['model_cache'] = sweep_input['model_cache']
+    model_inputs['precheck'] = True  # skip infeasible constant dispatch cases before the model is built
 
     # scenario specific inputs
     model_inputs['pwr2energy'] = sweep_input['pwr2energy']
@@ -52,53 +55,143 @@ def parameter_sweep(sweep_input):
     if model_inputs['objective'] == 'CONST_DISPATCH_OPT':
         model_inputs['X_dispatch'] = sweep_input['capacity']
 
-    print('Scenario: ' + str(sweep_input['scenario']))
-    print('X_wind:   ' + str(model_inputs['X_wind']))
-    print('Capacity: ' + str(sweep_input['capacity']))
-    print('Objective: ' + str(sweep_input['objective']))
+    return model_inputs
 
-    # run model
-    model = ocaes(data, model_inputs)
-    df, s = model.get_full_results()
-    revenue, LCOE, COVE, avoided_emissions, ROI = model.post_process(s)
 
-    # save results
-    results = pd.Series(index=('revenue', 'LCOE', 'COVE', 'avoided_emissions', 'solve_time'), dtype='float64')
-    results['revenue'] = revenue
-    results['LCOE'] = LCOE
-    results['COVE'] = COVE
-    results['avoided_emissions'] = avoided_emissions
-    results['ROI'] = ROI
-    results['solve_time'] = time.time() - t0
-    # additional outputs
-    results['avoided_emissions_tonnes'] = s['avoided_emissions']
-    results['yearly_electricity_MWh'] = s['yearly_electricity']
-    results['yearly_electricity_generated_MWh'] = s['yearly_electricity_generated']
-    results['yearly_electricity_purchased_MWh'] = s['yearly_electricity_purchased']
-    results['yearly_exp_usage_MWh'] = s['yearly_exp_usage']
-    results['yearly_cmp_usage_MWh'] = s['yearly_cmp_usage']
-    results['yearly_curtailment_MWh'] = s['yearly_curtailment']
-    results['yearly_curtailment_fr'] = s['yearly_curtailment'] / s['yearly_electricity_generated']
-    results['yearly_electricity_revenue_dollars'] = s['yearly_electricity_revenue']
-    results['yearly_capacity_credit_dollars'] = s['yearly_capacity_credit']
-    results['yearly_total_revenue_dollars'] = s['yearly_total_revenue']
-    results['yearly_costs_dollars'] = s['yearly_costs']
-    results['yearly_profit_dollars'] = s['yearly_profit']
-    results['yearly_electricity_value_dollars'] = s['yearly_electricity_value']
-    results['price_grid_average_dollarsPerMWh'] = s['price_grid_average']
-
-    results['X_wind'] = s['X_wind']
-    results['X_well'] = s['X_well']
-    results['X_exp'] = s['X_exp']
-    results['X_cmp'] = s['X_cmp']
-    results['X_dispatch'] = s['X_dispatch']
-    results['storage_duration_hrs'] = s['E_well_duration']
-    results['E_well_init_fr'] = s['E_well_init_fr']
-    results['E_well_init'] = s['E_well_init']
-
-    # combine inputs and results to return in single series
-    single_output = pd.concat([sweep_input, results])
-    return single_output
+def parameter_sweep(sweep_inputs):
+    # run cases that share a timeseries, scenario and objective
+    # the model is built once, following cases only update the mutable parameters and solve again
+    model = None
+    outputs = []
+    for index in sweep_inputs.index:
+        sweep_input = sweep_inputs.loc[index]
+
+        # Record time to solve
+        t0 = time.time()
+
+        # create model
+        model_inputs = get_model_inputs(sweep_input)
+
+        print('Scenario: ' + str(sweep_input['scenario']))
+        print('X_wind:   ' + str(model_inputs['X_wind']))
+        print('Capacity: ' + str(sweep_input['capacity']))
+        print('Objective: ' + str(sweep_input['objective']))
+
+        # run model, cases that fail the constant dispatch precheck are skipped (see OCAES.OCAES_precheck), cases that
+        # the precheck leaves to the solver and fail to solve are recorded as infeasible, the sweep goes on
+        try:
+            if model is None:
+                data = pd.read_csv(sweep_input['timeseries_filename'])
+
+                # use the solver recommended for this objective and horizon, if solver tuning was run, cases run in
+                # parallel so all-core profiles (e.g. from a tuning file of python -m OCAES.solver_tuning
+                # --one_at_a_time) are not used
+                solver = None
+                tuned = recommended_solver(sweep_input['tuning_filename'], model_inputs['objective'], len(data))
+                if tuned is not None and tuned['solver_profile'] in parallel_profiles:
+                    model_inputs['backend'] = tuned['backend']
+                    model_inputs['solver_profile'] = tuned['solver_profile']
+                    solver = tuned['solver']
+                model = ocaes(data, model_inputs, solver=solver)
+                # the first case is solved cold, the following cases start from the previous basis if the solver kept it
+                cold_iterations, cold_solver_time = model.iterations, model.solver_time
+            else:
+                updates = {name: model_inputs[name] for name in mutable_inputs}
+                for name in capacity_vars.get(model_inputs['objective'], []):
+                    updates.pop(name, None)
+                model.resolve(**updates)
+        except InfeasibleDispatchError as error:
+            print('Skipped: ' + str(error))
+            results = pd.Series(index=('revenue', 'LCOE', 'COVE', 'avoided_emissions', 'solve_time'), dtype='float64')
+            results['solve_time'] = time.time() - t0
+            results['precheck'] = 'infeasible'
+            results['termination'] = 'infeasible'
+            outputs.append(pd.concat([sweep_input, results]))
+            continue
+        except Exception as error:  # solver failure, the next case builds a new model
+            print('Failed: ' + str(error))
+            results = pd.Series(index=('revenue', 'LCOE', 'COVE', 'avoided_emissions', 'solve_time'), dtype='float64')
+            results['solve_time'] = time.time() - t0
+            results['precheck'] = model.precheck[0] if model is not None and model.precheck is not None else \
+                'not checked'
+            results['termination'] = 'infeasible'
+            results['error'] = str(error)
+            outputs.append(pd.concat([sweep_input, results]))
+            model = None
+            continue
+        df, s = model.get_full_results()
+        revenue, LCOE, COVE, avoided_emissions, ROI = model.post_process(s)
+
+        # save results
+        results = pd.Series(index=('revenue', 'LCOE', 'COVE', 'avoided_emissions', 'solve_time'), dtype='float64')
+        results['revenue'] = revenue
+        results['LCOE'] = LCOE
+        results['COVE'] = COVE
+        results['avoided_emissions'] = avoided_emissions
+        results['ROI'] = ROI
+        results['solve_time'] = time.time() - t0
+        results['solver_time'] = model.solver_time  # solver call only, compare solver_io memory and file
+        results['solver_io'] = model.inputs['solver_io']
+        results['precheck'] = model.precheck[0] if model.precheck is not None else 'not checked'
+        results['termination'] = str(model.results.solver.termination_condition)  # results are nan unless optimal
+        results['duality_gap'] = model.duality_gap  # relative, barrier profile solutions are not crossed over
+        results['iterations'] = model.iterations
+        # warm start savings, estimated against the cold solve of the first case in the group, only for cases that
+        # started from the basis of the previous one (persistent pyomo solver), the sparse backend always solves cold
+        warm_start = model.basis_kept
+        results['warm_start'] = warm_start
+        results['iterations_saved'] = cold_iterations - model.iterations if warm_start else 0
+        results['time_saved'] = cold_solver_time - model.solver_time if warm_start else 0.0
+        print('Iterations: ' + str(results['iterations']) + ' (' + str(results['iterations_saved']) + ' saved)')
+        print('Time saved [s]: ' + str(round(results['time_saved'], 3)))
+        # additional outputs
+        results['avoided_emissions_tonnes'] = s['avoided_emissions']
+        results['yearly_electricity_MWh'] = s['yearly_electricity']
+        results['yearly_electricity_generated_MWh'] = s['yearly_electricity_generated']
+        results['yearly_electricity_purchased_MWh'] = s['yearly_electricity_purchased']
+        results['yearly_exp_usage_MWh'] = s['yearly_exp_usage']
+        results['yearly_cmp_usage_MWh'] = s['yearly_cmp_usage']
+        results['yearly_curtailment_MWh'] = s['yearly_curtailment']
+        results['yearly_curtailment_fr'] = s['yearly_curtailment'] / s['yearly_electricity_generated']
+        results['yearly_electricity_revenue_dollars'] = s['yearly_electricity_revenue']
+        results['yearly_capacity_credit_dollars'] = s['yearly_capacity_credit']
+        results['yearly_total_revenue_dollars'] = s['yearly_total_revenue']
+        results['yearly_costs_dollars'] = s['yearly_costs']
+        results['yearly_profit_dollars'] = s['yearly_profit']
+        results['yearly_electricity_value_dollars'] = s['yearly_electricity_value']
+        results['price_grid_average_dollarsPerMWh'] = s['price_grid_average']
+
+        results['X_wind'] = s['X_wind']
+        results['X_well'] = s['X_well']
+        results['X_exp'] = s['X_exp']
+        results['X_cmp'] = s['X_cmp']
+        results['X_dispatch'] = s['X_dispatch']
+        results['storage_duration_hrs'] = s['E_well_duration']
+        results['E_well_init_fr'] = s['E_well_init_fr']
+        results['E_well_init'] = s['E_well_init']
+
+        # combine inputs and results to return in single series
+        outputs.append(pd.concat([sweep_input, results]))
+    return outputs
+
+
+def near_boundary(df, metric='COVE', rtol=0.01, lower_is_better=True,
+                  by=('timeseries_filename', 'objective', 'capacity')):
+    # cases with metric within rtol (fraction) of the best case that shares the by columns, e.g. the storage scenarios
+    # closest to the best one at each capacity, returns a boolean Series aligned with df
+    best = df.groupby(list(by))[metric].transform('min' if lower_is_better else 'max')
+    return (df[metric] - best).abs() <= rtol * best.abs()
+
+
+def run_sweep(sweep_inputs, ncpus):
+    # run each group of cases that can share one model using parallelization, returns one row of results per case
+    groups = sweep_inputs.groupby(['timeseries_filename', 'objective', 'scenario'], sort=False).groups
+    with parallel_backend('multiprocessing', n_jobs=ncpus):
+        output = Parallel(n_jobs=ncpus, verbose=5)(
+            delayed(parameter_sweep)(sweep_inputs.loc[index])
+            for index in
+            groups.values())
+    return pd.DataFrame([single_output for group_output in output for single_output in group_output])
 
 
 # =====================
@@ -120,6 +213,14 @@ if __name__ == '__main__':
     timeseries_filenames = ['da_timeseries_inputs_2019.csv']  # list of csv files
     capacities = np.arange(10.0, 501, 10)
     objectives = ['COVE', 'CD_FIX_WIND_STOR']
+    solver_profile = 'sweep'  # solver threads and algorithm (see OCAES.OCAES.solver_profiles), 1 thread per case
+    tuning_filename = 'solver_tuning.csv'  # recommended solvers, replace solver_profile if present
+    # create with: python -m OCAES.solver_tuning da_timeseries_inputs_2019.csv --objectives COVE CD_FIX_WIND_STOR
+    screening = True  # solve with loose tolerances, then again at full precision near the decision boundary
+    refine_metric = 'COVE'  # results column that ranks the scenarios (lower is better)
+    refine_rtol = 0.01  # refine cases within this fraction of the best scenario at the same capacity
+    model_cache = 'model_cache'  # directory of compiled models (see OCAES.OCAES_cache), shared by workers and reruns
+    # used by the sparse backend (e.g. recommended by solver tuning), the pyomo model is built in each worker
 
     # ------------------
     # create sweep_inputs dataframe
@@ -133,6 +234,10 @@ if __name__ == '__main__':
                     df_scenario.loc[:, 'scenario'] = scenario
                     df_scenario.loc[:, 'timeseries_filename'] = timeseries_filename
                     df_scenario.loc[:, 'objective'] = objective
+                    df_scenario.loc[:, 'solver_profile'] = solver_profile
+                    df_scenario.loc[:, 'tuning_filename'] = tuning_filename
+                    df_scenario.loc[:, 'screening'] = screening
+                    df_scenario.loc[:, 'model_cache'] = model_cache
                     for capacity in capacities:
                         df_scenario.loc[:, 'capacity'] = capacity
                         sweep_inputs = sweep_inputs.append(df_scenario)
@@ -200,13 +305,21 @@ if __name__ == '__main__':
     except:
         ncpus = ncpus  # otherwise default to this number of cores
 
-    # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(sweep_inputs.loc[index])
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
+    # group cases that can share one model, sorted by capacity so neighbouring cases are solved in turn
+    sweep_inputs.loc[:, 'case'] = sweep_inputs.index  # matches the results to their inputs
+    sweep_inputs = sweep_inputs.sort_values(['timeseries_filename', 'objective', 'scenario', 'capacity'])
+    df = run_sweep(sweep_inputs, ncpus)
+    df.loc[:, 'refined'] = False
+
+    # solve the cases near the decision boundary again at full precision, replacing their screening results
+    if screening:
+        refine = near_boundary(df, metric=refine_metric, rtol=refine_rtol)
+        print('Refining ' + str(refine.sum()) + ' of ' + str(len(df)) + ' cases at full precision')
+        refine_inputs = sweep_inputs.loc[df.loc[refine, 'case']].copy()
+        refine_inputs.loc[:, 'screening'] = False
+        df_refined = run_sweep(refine_inputs, ncpus)
+        df_refined.loc[:, 'refined'] = True
+        df = pd.concat([df[~refine], df_refined]).sort_values('case').reset_index(drop=True)
 
     # save results
     df.to_csv('sweep_results.csv')
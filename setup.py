@@ -9,4 +9,5 @@ setup(name='OCAES',
       license='MIT',
       packages=['OCAES'],
       zip_safe=False,
-      install_requires=['pyomo', 'pandas', 'numpy', 'seaborn', 'matplotlib', 'scipy', 'joblib', 'xlrd', 'xlwt'])
+      install_requires=['pyomo>=6.4.2', 'highspy', 'pandas<2', 'numpy>=1.16.5', 'seaborn', 'matplotlib',
+                        'scipy>=1.7', 'joblib', 'xlrd', 'xlwt'])